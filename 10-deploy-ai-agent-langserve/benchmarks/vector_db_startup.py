@@ -0,0 +1,76 @@
+"""
+Measures import time and first-query latency of tools/vector_db_tools.py.
+
+Every run happens in a fresh Python process so the embedding model and Chroma
+are really loaded from scratch. Three start-up modes are compared:
+
+- eager: import, then build the Chroma instance right away (the old import-time behavior)
+- lazy:  import, then the first query builds the Chroma instance
+- warm:  import with VECTOR_DB_WARM_UP=true, idle for --idle seconds
+         (the time before the first request arrives), then query
+
+Usage:
+    python benchmarks/vector_db_startup.py --runs 3 --idle 10
+    python benchmarks/vector_db_startup.py --project ../llm-agent-evaluation-framework
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+DEFAULT_PROJECT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD_SCRIPT = """
+import json, sys, time
+mode, idle, question = sys.argv[1], float(sys.argv[2]), sys.argv[3]
+started = time.perf_counter()
+import tools.vector_db_tools as vector_db_tools
+if mode == "eager":
+    vector_db_tools.get_db()
+imported = time.perf_counter()
+time.sleep(idle)
+query_started = time.perf_counter()
+result = vector_db_tools.query_documents.invoke({"question": question})
+finished = time.perf_counter()
+print(json.dumps({
+    "import": imported - started,
+    "first_query": finished - query_started,
+    "error": result if result.startswith("Error") else None,
+}))
+"""
+
+
+def run_once(project: str, mode: str, idle: float, question: str) -> dict:
+    env = dict(os.environ, VECTOR_DB_WARM_UP="true" if mode == "warm" else "false")
+    completed = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT, mode, str(idle if mode == "warm" else 0), question],
+        cwd=project, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--project", default=DEFAULT_PROJECT, help="Project folder containing tools/vector_db_tools.py")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh processes per mode")
+    parser.add_argument("--idle", type=float, default=10.0, help="Seconds between import and first query in warm mode")
+    parser.add_argument("--question", default="What are the action items from the last meeting?")
+    args = parser.parse_args()
+
+    for mode in ("eager", "lazy", "warm"):
+        results = [run_once(args.project, mode, args.idle, args.question) for _ in range(args.runs)]
+        errors = [result["error"] for result in results if result["error"]]
+        print(
+            f"{mode:>5}: import {statistics.median(r['import'] for r in results) * 1000:8.1f} ms"
+            f" | first query {statistics.median(r['first_query'] for r in results) * 1000:8.1f} ms"
+            f" (median of {args.runs})"
+        )
+        if errors:
+            print(f"       query failed: {errors[0]}")
+
+
+if __name__ == "__main__":
+    main()
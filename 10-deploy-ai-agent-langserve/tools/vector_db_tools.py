@@ -1,21 +1,76 @@
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from dotenv import load_dotenv
+import multiprocessing
+import itertools
+import threading
 import hashlib
+import time
+import glob
+import os
 import re
 
 from langchain_core.tools import tool
 from langchain_community.document_loaders import TextLoader
 from langchain_community.embeddings.sentence_transformer import SentenceTransformerEmbeddings
 from langchain_community.document_loaders import DirectoryLoader
-from langchain_text_splitters import CharacterTextSplitter
+from langchain_text_splitters import CharacterTextSplitter, RecursiveCharacterTextSplitter
 from langchain_chroma import Chroma
 
+from tools.embedding_cache import CachedEmbeddings
+
+load_dotenv()
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
 def get_chroma_instance():
-    # Create the open-source embedding function
-    embedding_function = SentenceTransformerEmbeddings(model_name="all-MiniLM-L6-v2")
+    # Create the open-source embedding function, cached on disk so text is only ever embedded once
+    embedding_function = CachedEmbeddings(SentenceTransformerEmbeddings(model_name=EMBEDDING_MODEL), EMBEDDING_MODEL)
 
     # Get the Chroma instance from what is saved to the disk
     return Chroma(persist_directory="./chroma_db", embedding_function=embedding_function)
 
-db = get_chroma_instance()
+# Loading the embedding model and opening Chroma takes seconds and hundreds of MB,
+# so it happens on first use instead of when the tools are imported
+_db = None
+_db_lock = threading.Lock()
+
+def get_db() -> Chroma:
+    """
+    Returns the shared Chroma instance, creating it on first use.
+    Safe to call from several threads at once - only one of them builds the instance.
+    """
+    global _db
+    if _db is None:
+        with _db_lock:
+            if _db is None:
+                _db = get_chroma_instance()
+    return _db
+
+def _warm_up_db():
+    try:
+        # Also run one embedding so the first real query doesn't pay for model initialization
+        get_db().embeddings.base_embeddings.embed_query("warm up")
+    except Exception:
+        # The first tool call will try again and report the error to the agent
+        pass
+
+def warm_up_vector_db() -> threading.Thread:
+    """
+    Loads the embedding model and opens Chroma on a background thread
+    so the first query doesn't have to wait for them.
+
+    Returns:
+    - threading.Thread: The warm-up thread, already started.
+    """
+    thread = threading.Thread(target=_warm_up_db, name="vector-db-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+# Set VECTOR_DB_WARM_UP=true to start loading right after import instead of on the first query
+# (not in ingestion worker processes, which only parse files)
+if os.getenv("VECTOR_DB_WARM_UP", "false").lower() == "true" and multiprocessing.parent_process() is None:
+    warm_up_vector_db()
 
 def string_to_vector_id(input_string: str, max_length: int = 64) -> str:
     """
@@ -46,6 +101,219 @@ def string_to_vector_id(input_string: str, max_length: int = 64) -> str:
     
     return sanitized_string
 
+# Chunks are sized in tokens of the embedding model, which ignores everything past
+# its 256-token window - whole files used to be cut off after their first paragraphs
+CHUNK_TOKENS = int(os.getenv("VECTOR_DB_CHUNK_TOKENS") or "200")
+CHUNK_OVERLAP_TOKENS = int(os.getenv("VECTOR_DB_CHUNK_OVERLAP_TOKENS") or "30")
+EMBED_BATCH_SIZE = int(os.getenv("VECTOR_DB_EMBED_BATCH_SIZE") or "64")
+INGEST_WORKERS = int(os.getenv("VECTOR_DB_INGEST_WORKERS") or min(4, os.cpu_count() or 1))
+
+def document_vector_id(file_path: str) -> str:
+    """
+    Stable ID for a document, derived from its absolute path so that
+    equal filenames in different folders don't overwrite each other.
+    """
+    return hashlib.sha256(os.path.abspath(file_path).encode()).hexdigest()[:32]
+
+def get_tokenizer():
+    # The tokenizer of the sentence-transformers model behind the embedding function
+    return get_db().embeddings.base_embeddings.client.tokenizer
+
+def split_into_chunks(docs: list) -> list:
+    """
+    Splits loaded documents into chunks that fit the embedding model's window.
+
+    Arguments:
+    - docs (list): LangChain documents, e.g. from TextLoader.load()
+
+    Returns:
+    - list: The chunks as LangChain documents, keeping the metadata of their document
+    """
+    splitter = RecursiveCharacterTextSplitter.from_huggingface_tokenizer(
+        get_tokenizer(), chunk_size=CHUNK_TOKENS, chunk_overlap=CHUNK_OVERLAP_TOKENS
+    )
+    return splitter.split_documents(docs)
+
+def replace_document_chunks(file_path: str, chunks: list) -> dict:
+    """
+    Embeds the chunks of one document in batches and replaces what the knowledgebase held for it.
+
+    All chunks are embedded before anything is written, so a failed embedding leaves the
+    previous version untouched. The chunks are then upserted under deterministic IDs
+    (<document ID>_<chunk number>), and leftover chunks of the previous version are only
+    deleted afterwards, so the document never disappears from search while it is replaced.
+
+    Arguments:
+    - file_path (str): The path the chunks were loaded from
+    - chunks (list): The document's chunks from split_into_chunks
+
+    Returns:
+    - dict: Number of chunks, tokens embedded, chunks found in the embedding cache, stale chunks removed and seconds taken
+    """
+    started = time.perf_counter()
+    db = get_db()
+    cache_hits = db.embeddings.hits
+    doc_id = document_vector_id(file_path)
+    texts = [chunk.page_content for chunk in chunks]
+    ids = [f"{doc_id}_{index}" for index in range(len(chunks))]
+    metadatas = [{**chunk.metadata, "doc_id": doc_id, "chunk": index} for index, chunk in enumerate(chunks)]
+
+    embeddings = []
+    for start in range(0, len(texts), EMBED_BATCH_SIZE):
+        embeddings.extend(db.embeddings.embed_documents(texts[start:start + EMBED_BATCH_SIZE]))
+
+    for start in range(0, len(ids), EMBED_BATCH_SIZE):
+        end = start + EMBED_BATCH_SIZE
+        db._collection.upsert(
+            ids=ids[start:end], embeddings=embeddings[start:end],
+            documents=texts[start:end], metadatas=metadatas[start:end]
+        )
+    removed = delete_stale_chunks(db, file_path, len(chunks))
+
+    tokens = sum(len(input_ids) for input_ids in get_tokenizer()(texts, add_special_tokens=False)["input_ids"]) if texts else 0
+    return {
+        "chunks": len(chunks),
+        "tokens": tokens,
+        "cached": db.embeddings.hits - cache_hits,
+        "removed": removed,
+        "seconds": time.perf_counter() - started
+    }
+
+def delete_stale_chunks(db: Chroma, file_path: str, chunk_count: int) -> int:
+    """
+    Deletes the chunks of a document that are left over from a previous version,
+    once its current chunks 0 to chunk_count - 1 are written.
+
+    Returns:
+    - int: The number of chunks deleted
+    """
+    doc_id = document_vector_id(file_path)
+    current_ids = {f"{doc_id}_{index}" for index in range(chunk_count)}
+    # Also matches the single whole-file entry older versions of this tool stored per source
+    stored = db._collection.get(where={"$or": [{"doc_id": doc_id}, {"source": file_path}]}, include=[])
+    stale_ids = [vector_id for vector_id in stored["ids"] if vector_id not in current_ids]
+    if stale_ids:
+        db._collection.delete(ids=stale_ids)
+    return len(stale_ids)
+
+_worker_tokenizer = None
+_worker_splitter = None
+
+def _load_and_split(file_path: str) -> tuple:
+    """
+    Runs in an ingestion worker process: loads one file and splits it into chunks.
+    Only the tokenizer is loaded here, never the embedding model.
+
+    Returns:
+    - tuple: (file path, list of (text, metadata) pairs, token count, error message or None)
+    """
+    global _worker_tokenizer, _worker_splitter
+    try:
+        if _worker_splitter is None:
+            from transformers import AutoTokenizer
+            _worker_tokenizer = AutoTokenizer.from_pretrained(f"sentence-transformers/{EMBEDDING_MODEL}")
+            _worker_splitter = RecursiveCharacterTextSplitter.from_huggingface_tokenizer(
+                _worker_tokenizer, chunk_size=CHUNK_TOKENS, chunk_overlap=CHUNK_OVERLAP_TOKENS
+            )
+        chunks = _worker_splitter.split_documents(TextLoader(file_path).load())
+        texts = [chunk.page_content for chunk in chunks]
+        tokens = sum(len(input_ids) for input_ids in _worker_tokenizer(texts, add_special_tokens=False)["input_ids"]) if texts else 0
+        return file_path, [(chunk.page_content, chunk.metadata) for chunk in chunks], tokens, None
+    except Exception as e:
+        return file_path, [], 0, str(e)
+
+def index_directory(directory_path: str, glob_pattern: str = "**/*") -> dict:
+    """
+    Adds every file matching glob_pattern under directory_path to the knowledgebase.
+
+    Files are loaded and split in a pool of INGEST_WORKERS processes while the
+    main process embeds and writes the chunks in batches of EMBED_BATCH_SIZE.
+    At most two files per worker are parsed ahead of the embedding stage, so
+    memory use doesn't grow with the size of the directory. As with a single
+    file, chunks left over from a file's previous version are deleted once all
+    of its current chunks are written.
+
+    Returns:
+    - dict: Counts (files, chunks, tokens, cached, removed), failed files with their
+      errors, and seconds spent in total, embedding, writing and waiting for parsing
+    """
+    started = time.perf_counter()
+    files = sorted(
+        path for path in glob.glob(os.path.join(directory_path, glob_pattern), recursive=True)
+        if os.path.isfile(path)
+    )
+    stats = {
+        "files": 0, "chunks": 0, "tokens": 0, "cached": 0, "removed": 0, "failed": [],
+        "seconds": 0.0, "embed_seconds": 0.0, "write_seconds": 0.0, "parse_wait_seconds": 0.0
+    }
+    if not files:
+        return stats
+
+    db = get_db()
+    cache_hits = db.embeddings.hits
+    pending = deque()  # (file path, chunk id, text, metadata) waiting to be embedded
+    unwritten = {}  # file path -> (chunk count, chunks not written yet)
+
+    def finish_file(file_path: str, chunk_count: int):
+        write_started = time.perf_counter()
+        stats["removed"] += delete_stale_chunks(db, file_path, chunk_count)
+        stats["write_seconds"] += time.perf_counter() - write_started
+        stats["files"] += 1
+
+    def flush_batch():
+        batch = [pending.popleft() for _ in range(min(EMBED_BATCH_SIZE, len(pending)))]
+        embed_started = time.perf_counter()
+        embeddings = db.embeddings.embed_documents([text for _, _, text, _ in batch])
+        write_started = time.perf_counter()
+        db._collection.upsert(
+            ids=[chunk_id for _, chunk_id, _, _ in batch],
+            embeddings=embeddings,
+            documents=[text for _, _, text, _ in batch],
+            metadatas=[metadata for _, _, _, metadata in batch]
+        )
+        stats["embed_seconds"] += write_started - embed_started
+        stats["write_seconds"] += time.perf_counter() - write_started
+        for file_path, _, _, _ in batch:
+            chunk_count, remaining = unwritten[file_path]
+            if remaining == 1:
+                del unwritten[file_path]
+                finish_file(file_path, chunk_count)
+            else:
+                unwritten[file_path] = (chunk_count, remaining - 1)
+
+    # Spawned rather than forked workers: forking a process that runs torch threads can deadlock
+    with ProcessPoolExecutor(max_workers=INGEST_WORKERS, mp_context=multiprocessing.get_context("spawn")) as pool:
+        remaining_files = iter(files)
+        in_flight = deque(pool.submit(_load_and_split, path) for path in itertools.islice(remaining_files, INGEST_WORKERS * 2))
+        while in_flight:
+            wait_started = time.perf_counter()
+            file_path, chunks, tokens, error = in_flight.popleft().result()
+            stats["parse_wait_seconds"] += time.perf_counter() - wait_started
+            for path in itertools.islice(remaining_files, 1):
+                in_flight.append(pool.submit(_load_and_split, path))
+
+            if error:
+                stats["failed"].append((file_path, error))
+                continue
+            stats["chunks"] += len(chunks)
+            stats["tokens"] += tokens
+            if not chunks:
+                finish_file(file_path, 0)
+                continue
+
+            doc_id = document_vector_id(file_path)
+            unwritten[file_path] = (len(chunks), len(chunks))
+            for index, (text, metadata) in enumerate(chunks):
+                pending.append((file_path, f"{doc_id}_{index}", text, {**metadata, "doc_id": doc_id, "chunk": index}))
+            while len(pending) >= EMBED_BATCH_SIZE:
+                flush_batch()
+
+    while pending:
+        flush_batch()
+    stats["cached"] = db.embeddings.hits - cache_hits
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
 @tool
 def query_documents(question: str) -> str:
     """
@@ -61,7 +329,7 @@ def query_documents(question: str) -> str:
         str: The list of texts (and their sources) that matched with the question the closest using RAG
     """
     try:
-        similar_docs = db.similarity_search(question, k=3)
+        similar_docs = get_db().similarity_search(question, k=3)
         docs_formatted = list(map(lambda doc: f"Source: {doc.metadata.get('source', 'NA')}\nContent: {doc.page_content}", similar_docs))
 
         return str(docs_formatted)     
@@ -73,8 +341,8 @@ def add_doc_to_knowledgebase(file_path: str) -> str:
     """
     Adds a local document to the vector DB knowledgbase for RAG.
     This function can only be called on local documents - Google Drive docs must be downloaded first.
-    The content of the file is put in the vector DB with the metadata
-    including the file source. ID is randomly generated.
+    The file is split into chunks that are put in the vector DB with the metadata
+    including the file source. Adding a file again replaces its previous chunks.
 
     Example call:
 
@@ -87,11 +355,53 @@ def add_doc_to_knowledgebase(file_path: str) -> str:
     try:
         loader = TextLoader(file_path)
         doc_arr = loader.load()
-        db.add_documents(documents=doc_arr, ids=[string_to_vector_id(file_path.split("/")[-1])])
-        return "Successfully added the file to the knowledgebase."
+        stats = replace_document_chunks(file_path, split_into_chunks(doc_arr))
+        seconds = max(stats["seconds"], 1e-9)
+        return (
+            f"Successfully added the file to the knowledgebase: {stats['chunks']} chunks, {stats['tokens']} tokens "
+            f"in {stats['seconds']:.2f}s ({stats['tokens'] / seconds:.0f} tokens/s), "
+            f"{stats['cached']} chunks reused from the embedding cache, {stats['removed']} outdated chunks removed."
+        )
     except Exception as e:
         return f"Error adding file to knowledgbase: {e}"
 
+@tool
+def add_directory_to_knowledgebase(directory_path: str, glob_pattern: str = "**/*") -> str:
+    """
+    Adds all local documents in a directory (including subfolders) to the vector DB knowledgbase for RAG in one call.
+    Use this instead of calling add_doc_to_knowledgebase for each file when there are several files to add.
+    Files that were added before are replaced with their current content.
+
+    Example call:
+
+    add_directory_to_knowledgebase("/path/to/meeting/notes", "**/*.txt")
+    Args:
+        directory_path (str): The local directory to add to the knowledgebase (NOT Google Drive)
+        glob_pattern (str): Which files in the directory to add. Defaults to every file in every subfolder
+    Returns:
+        str: A summary of the files, chunks and tokens added and how long it took
+    """
+    try:
+        stats = index_directory(directory_path, glob_pattern)
+        if not stats["files"] and not stats["failed"]:
+            return f"No files matching {glob_pattern} were found in {directory_path}."
+
+        seconds = max(stats["seconds"], 1e-9)
+        summary = (
+            f"Added {stats['files']} {'file' if stats['files'] == 1 else 'files'} from {directory_path} to the knowledgebase: "
+            f"{stats['chunks']} chunks ({stats['cached']} reused from the embedding cache), {stats['tokens']} tokens, "
+            f"{stats['removed']} outdated chunks removed "
+            f"in {stats['seconds']:.1f}s ({stats['tokens'] / seconds:.0f} tokens/s; embedding {stats['embed_seconds']:.1f}s, "
+            f"writing {stats['write_seconds']:.1f}s, waiting for parsing {stats['parse_wait_seconds']:.1f}s)."
+        )
+        if stats["failed"]:
+            failures = "; ".join(f"{path} ({error[:100]})" for path, error in stats["failed"][:5])
+            more = f" and {len(stats['failed']) - 5} more" if len(stats["failed"]) > 5 else ""
+            summary += f" {len(stats['failed'])} {'file' if len(stats['failed']) == 1 else 'files'} could not be added: {failures}{more}."
+        return summary
+    except Exception as e:
+        return f"Error adding directory to knowledgbase: {e}"
+
 @tool
 def clear_knowledgebase() -> str:
     """
@@ -104,7 +414,7 @@ def clear_knowledgebase() -> str:
         str: The success of the operation of clearing the vector DB
     """
     try:
-        db.reset_collection()
+        get_db().reset_collection()
         return "Successfully cleared the knowledgebase."
     except Exception as e:
         return f"Error clearing the knowledgbase: {e}"
@@ -115,5 +425,6 @@ def clear_knowledgebase() -> str:
 available_vector_db_functions = {
     "query_documents": query_documents,
     "add_doc_to_knowledgebase": add_doc_to_knowledgebase,
+    "add_directory_to_knowledgebase": add_directory_to_knowledgebase,
     "clear_knowledgebase": clear_knowledgebase
 }      
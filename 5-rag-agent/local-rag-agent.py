@@ -4,6 +4,7 @@ from langchain_community.embeddings.sentence_transformer import SentenceTransfor
 from langchain_core.messages import SystemMessage, AIMessage, HumanMessage
 from langchain_community.document_loaders import DirectoryLoader
 from langchain_text_splitters import CharacterTextSplitter
+from embedding_cache import CachedEmbeddings
 from dotenv import load_dotenv
 from datetime import datetime
 import streamlit as st
@@ -53,8 +54,8 @@ def get_chroma_instance():
     # Get the documents split into chunks
     docs = load_documents(rag_directory)
 
-    # create the open-sourc e embedding function
-    embedding_function = SentenceTransformerEmbeddings(model_name="all-MiniLM-L6-v2")
+    # create the open-sourc e embedding function, cached on disk so restarts don't re-embed unchanged documents
+    embedding_function = CachedEmbeddings(SentenceTransformerEmbeddings(model_name="all-MiniLM-L6-v2"), "all-MiniLM-L6-v2")
 
     # load it into Chroma
     return Chroma.from_documents(docs, embedding_function)
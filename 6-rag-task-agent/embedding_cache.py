@@ -0,0 +1,159 @@
+from langchain_core.embeddings import Embeddings
+from array import array
+import threading
+import hashlib
+import sqlite3
+import time
+import os
+
+# Select batches of hashes well below SQLite's limit on bound parameters
+LOOKUP_BATCH_SIZE = 500
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an embedding function with a persistent on-disk cache so text that was
+    embedded before - in this run or an earlier one - is never embedded again.
+
+    Entries are keyed on the model name and the SHA-256 of the text and stored as
+    float32 blobs in SQLite. Once the cache grows past max_bytes, the least recently
+    used entries are evicted. Safe to share between threads, and between processes
+    through the same file.
+
+    Arguments:
+    - embeddings (Embeddings): The embedding function to cache, e.g. SentenceTransformerEmbeddings
+    - model_name (str): Name of the model behind it; part of the cache key
+    - path (str, optional): SQLite file. Defaults to EMBEDDING_CACHE_PATH or ./embedding_cache.sqlite3
+    - max_bytes (int, optional): Size cap for the stored vectors. Defaults to EMBEDDING_CACHE_MAX_MB or 512 MB
+
+    Example usage:
+    CachedEmbeddings(SentenceTransformerEmbeddings(model_name="all-MiniLM-L6-v2"), "all-MiniLM-L6-v2")
+    """
+
+    def __init__(self, embeddings: Embeddings, model_name: str, path: str = None, max_bytes: int = None):
+        self.base_embeddings = embeddings
+        self.model_name = model_name
+        # Blank settings (as in .env.example) mean the default; an empty path would be a throwaway in-memory database
+        self.path = path or os.getenv("EMBEDDING_CACHE_PATH") or "./embedding_cache.sqlite3"
+        self.max_bytes = max_bytes or int(float(os.getenv("EMBEDDING_CACHE_MAX_MB") or "512") * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, text_hash BLOB NOT NULL, vector BLOB NOT NULL, last_used REAL NOT NULL, "
+            "PRIMARY KEY (model, text_hash)) WITHOUT ROWID"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._connection.commit()
+        self._estimated_bytes = self._total_bytes()
+
+    def embed_documents(self, texts: list) -> list:
+        return self._embed(texts, f"{self.model_name}:document", self.base_embeddings.embed_documents)
+
+    def embed_query(self, text: str) -> list:
+        # Cached apart from documents since some models embed queries differently
+        return self._embed([text], f"{self.model_name}:query", lambda missing: [self.base_embeddings.embed_query(missing[0])])[0]
+
+    def _embed(self, texts: list, model_key: str, embed_missing) -> list:
+        hashes = [hashlib.sha256(text.encode()).digest() for text in texts]
+        vectors = self._lookup(model_key, set(hashes))
+
+        # Embed each missing text once, even if it occurs several times in this call
+        missing = {}
+        for text_hash, text in zip(hashes, texts):
+            if text_hash not in vectors:
+                missing.setdefault(text_hash, text)
+        if missing:
+            new_vectors = embed_missing(list(missing.values()))
+            vectors.update(zip(missing.keys(), new_vectors))
+            self._store(model_key, [(text_hash, vectors[text_hash]) for text_hash in missing])
+
+        with self._lock:
+            self.misses += len(missing)
+            self.hits += len(texts) - len(missing)
+        return [vectors[text_hash] for text_hash in hashes]
+
+    def _lookup(self, model_key: str, hashes: set) -> dict:
+        hashes = list(hashes)
+        vectors = {}
+        with self._lock:
+            for start in range(0, len(hashes), LOOKUP_BATCH_SIZE):
+                batch = hashes[start:start + LOOKUP_BATCH_SIZE]
+                rows = self._connection.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({','.join('?' * len(batch))})",
+                    [model_key, *batch]
+                ).fetchall()
+                for text_hash, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    vectors[text_hash] = vector.tolist()
+            if vectors:
+                now = time.time()
+                self._connection.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model_key, text_hash) for text_hash in vectors]
+                )
+                self._connection.commit()
+        return vectors
+
+    def _store(self, model_key: str, entries: list):
+        now = time.time()
+        rows = [(model_key, text_hash, array("f", vector).tobytes(), now) for text_hash, vector in entries]
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)", rows
+            )
+            self._connection.commit()
+            self._estimated_bytes += sum(len(row[2]) for row in rows)
+            self._evict()
+
+    def _total_bytes(self) -> int:
+        return self._connection.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+
+    def _evict(self):
+        # The running estimate avoids summing the whole table on every insert; it is
+        # re-counted before evicting since other processes may share the file
+        if self._estimated_bytes <= self.max_bytes:
+            return
+        total_bytes = self._total_bytes()
+        # Trim to 90% of the cap so eviction doesn't run again on the next insert
+        target_bytes = int(self.max_bytes * 0.9) if total_bytes > self.max_bytes else total_bytes
+        while total_bytes > target_bytes:
+            oldest = self._connection.execute(
+                "SELECT model, text_hash, LENGTH(vector) FROM embeddings ORDER BY last_used LIMIT 1000"
+            ).fetchall()
+            if not oldest:
+                break
+            evicted = []
+            for model, text_hash, size in oldest:
+                if total_bytes <= target_bytes:
+                    break
+                evicted.append((model, text_hash))
+                total_bytes -= size
+            self._connection.executemany("DELETE FROM embeddings WHERE model = ? AND text_hash = ?", evicted)
+            self.evictions += len(evicted)
+        self._connection.commit()
+        self._estimated_bytes = total_bytes
+
+    def stats(self) -> dict:
+        """
+        Returns:
+        - dict: Hits, misses and hit rate since this instance was created, plus the entries, bytes and evictions of the cache
+        """
+        with self._lock:
+            entries, total_bytes = self._connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+            ).fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "entries": entries,
+                "bytes": total_bytes,
+                "evictions": self.evictions
+            }
@@ -1,35 +1,143 @@
 from langchain_community.embeddings.sentence_transformer import SentenceTransformerEmbeddings
-from langchain_community.document_loaders import DirectoryLoader
+from langchain_community.document_loaders import UnstructuredFileLoader
 from langchain_text_splitters import CharacterTextSplitter
 from langchain_chroma import Chroma
+from embedding_cache import CachedEmbeddings
 from dotenv import load_dotenv
+from pathlib import Path
+import argparse
+import hashlib
+import json
 import os
 
 load_dotenv()
 
 rag_directory = os.getenv('DIRECTORY', 'meeting_notes')
+persist_directory = "./chroma_db"
 
-def load_documents(directory):
-    # Load the PDF or txt documents from the directory
-    loader = DirectoryLoader(directory)
-    documents = loader.load()
+# Remembers the content hash of every file already in Chroma so that re-running the
+# loader only embeds what changed. Kept next to the database so deleting one resets both.
+manifest_path = os.getenv('MANIFEST_PATH') or os.path.join(persist_directory, "rag_manifest.json")
 
-    # Split the documents into chunks
+def list_files(directory):
+    # The same files DirectoryLoader picks up by default: everything that isn't hidden
+    return sorted(path for path in Path(directory).glob("**/[!.]*") if path.is_file())
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def document_id(relative_path):
+    # Based on the whole path inside the directory so equal filenames in different folders get different IDs
+    return hashlib.sha256(relative_path.encode()).hexdigest()[:32]
+
+def load_manifest():
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path) as file:
+        return json.load(file)
+
+def save_manifest(manifest):
+    # Write to a temporary file first so an interrupted run never leaves a half-written manifest
+    os.makedirs(os.path.dirname(manifest_path) or ".", exist_ok=True)
+    temporary_path = f"{manifest_path}.tmp"
+    with open(temporary_path, "w") as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+    os.replace(temporary_path, manifest_path)
+
+def compute_delta(directory, manifest):
+    """
+    Compares the files in the directory with the manifest.
+
+    Returns:
+        dict: Relative paths that were added, modified, removed and unchanged,
+        plus the current content hash and source path of every file
+    """
+    delta = {"added": [], "modified": [], "removed": [], "unchanged": [], "files": {}}
+    for path in list_files(directory):
+        relative_path = path.relative_to(directory).as_posix()
+        content_hash = file_hash(path)
+        delta["files"][relative_path] = {"hash": content_hash, "source": str(path)}
+
+        if relative_path not in manifest:
+            delta["added"].append(relative_path)
+        elif manifest[relative_path]["hash"] != content_hash:
+            delta["modified"].append(relative_path)
+        else:
+            delta["unchanged"].append(relative_path)
+
+    delta["removed"] = sorted(set(manifest) - set(delta["files"]))
+    return delta
+
+def load_file(source):
+    # Load the PDF or txt document
+    documents = UnstructuredFileLoader(source).load()
+
+    # Split the document into chunks
     text_splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=0)
-    docs = text_splitter.split_documents(documents)
+    return text_splitter.split_documents(documents)
+
+def delete_chunks(db, source, keep_ids=()):
+    # Finds chunks by their source so entries written by older versions of this loader are cleaned up too
+    keep_ids = set(keep_ids)
+    stored_ids = db._collection.get(where={"source": source}, include=[])["ids"]
+    stale_ids = [chunk_id for chunk_id in stored_ids if chunk_id not in keep_ids]
+    if stale_ids:
+        db._collection.delete(ids=stale_ids)
+    return len(stale_ids)
 
-    return docs
+def print_delta(delta):
+    print(
+        f"{len(delta['added'])} added, {len(delta['modified'])} modified, "
+        f"{len(delta['removed'])} removed, {len(delta['unchanged'])} unchanged"
+    )
+    for change in ("added", "modified", "removed"):
+        for relative_path in delta[change]:
+            print(f"  {change:>8}: {relative_path}")
 
 def main():
-    # Get the documents split into chunks
-    docs = load_documents(rag_directory)
+    parser = argparse.ArgumentParser(description="Incrementally loads the documents in DIRECTORY into Chroma for RAG")
+    parser.add_argument("--dry-run", action="store_true", help="Only report which files would be added, re-embedded or deleted")
+    args = parser.parse_args()
+
+    manifest = load_manifest()
+    delta = compute_delta(rag_directory, manifest)
+    print_delta(delta)
+    if args.dry_run or not (delta["added"] or delta["modified"] or delta["removed"]):
+        return
+
+    # Create the open-source embedding function, cached on disk so unchanged chunks of edited files aren't embedded again
+    embedding_function = CachedEmbeddings(SentenceTransformerEmbeddings(model_name="all-MiniLM-L6-v2"), "all-MiniLM-L6-v2")
+
+    # Get the Chroma instance from what is saved to the disk
+    db = Chroma(persist_directory=persist_directory, embedding_function=embedding_function)
+
+    for relative_path in delta["removed"]:
+        delete_chunks(db, manifest[relative_path]["source"])
+        del manifest[relative_path]
+        save_manifest(manifest)
+
+    for relative_path in delta["added"] + delta["modified"]:
+        file_info = delta["files"][relative_path]
+        docs = load_file(file_info["source"])
+        doc_id = document_id(relative_path)
+        ids = [f"{doc_id}_{index}" for index in range(len(docs))]
+
+        # Existing IDs are overwritten in place, then chunks the new version no longer has are deleted
+        if docs:
+            db.add_documents(documents=docs, ids=ids)
+        delete_chunks(db, file_info["source"], keep_ids=ids)
 
-    # Create the open-source embedding function
-    embedding_function = SentenceTransformerEmbeddings(model_name="all-MiniLM-L6-v2")
+        manifest[relative_path] = {"hash": file_info["hash"], "source": file_info["source"], "chunks": len(docs)}
+        save_manifest(manifest)
+        print(f"Embedded {relative_path} ({len(docs)} chunks)")
 
-    # Load the documents into Chroma and save it to the disk
-    Chroma.from_documents(docs, embedding_function, persist_directory="./chroma_db")
+    cache_stats = embedding_function.stats()
+    print(f"Embedding cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%} hit rate), {cache_stats['entries']} entries")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
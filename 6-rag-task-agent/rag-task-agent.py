@@ -15,6 +15,7 @@ from langchain_community.embeddings.sentence_transformer import SentenceTransfor
 from langchain_community.document_loaders import DirectoryLoader
 from langchain_text_splitters import CharacterTextSplitter
 from langchain_chroma import Chroma
+from embedding_cache import CachedEmbeddings
 
 load_dotenv()
 
@@ -40,7 +41,7 @@ workspace_gid = os.getenv("ASANA_WORKPLACE_ID", "")
 @st.cache_resource
 def get_chroma_instance():
     # Create the open-source embedding function
-    embedding_function = SentenceTransformerEmbeddings(model_name="all-MiniLM-L6-v2")
+    embedding_function = CachedEmbeddings(SentenceTransformerEmbeddings(model_name="all-MiniLM-L6-v2"), "all-MiniLM-L6-v2")
 
     # Get the Chroma instance from what is saved to the disk
     return Chroma(persist_directory="./chroma_db", embedding_function=embedding_function)
@@ -0,0 +1,119 @@
+"""
+Checks that a streamed reply nobody reads gives back what it holds.
+
+A streaming Pipe.pipe call returns an async generator that owns an admission
+slot, the single-flight entry duplicates wait on, and an open response. When
+the client goes away before OpenWebUI starts streaming, that generator is
+never iterated. Against a stub n8n webhook and with one admission slot, this
+check drops one generator unread, leaves another unread past its deadline
+and duplicates a request that never finishes. It then verifies the slot, the
+flight and the response are released and that neither other users nor
+duplicates are left hanging.
+Exits non-zero on failure.
+
+Usage:
+    python benchmarks/abandoned_stream.py
+"""
+
+import argparse
+import asyncio
+import gc
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from concurrent_chats import DEFAULT_PIPE_PATH, load_pipe_module, make_event_emitter
+from stub_n8n import StubN8NServer, serve_in_thread
+
+
+async def stream_request(pipe, user: str, chat_id: str, message: str):
+    body = {"stream": True, "messages": [{"role": "user", "content": message}]}
+    return await pipe.pipe(body, __user__={"id": user}, __event_emitter__=make_event_emitter(chat_id, []))
+
+
+async def drain(result) -> str:
+    if not hasattr(result, "__aiter__"):
+        return result["messages"][-1]["content"]
+    return "".join([chunk async for chunk in result])
+
+
+async def complete_request(pipe, user: str, chat_id: str, message: str) -> str:
+    return await drain(await stream_request(pipe, user, chat_id, message))
+
+
+async def run(pipe_path: str, timeout: float) -> list:
+    failures = []
+    module = load_pipe_module(pipe_path)
+    pipe = module.Pipe()
+    pipe.valves.enable_streaming = True
+    pipe.valves.max_concurrent_executions = 1
+    pipe.valves.admission_queue_timeout = timeout * 3
+    pipe.valves.timeout = timeout
+
+    server = StubN8NServer(latency=0.05, stream=True)
+    with serve_in_thread(server):
+        pipe.valves.n8n_url = server.url
+
+        # 1. Dropped without ever being iterated
+        dropped = await stream_request(pipe, "user-a", "chat-a", "tell me about the roadmap")
+        response = dropped.ag_frame.f_locals["response"]
+        del dropped
+        gc.collect()
+        await asyncio.sleep(0.05)
+        if pipe.admission.stats()["active"]:
+            failures.append("dropped stream kept its admission slot")
+        if pipe._inflight:
+            failures.append("dropped stream left its flight registered")
+        if not response.is_closed:
+            failures.append("dropped stream left its response open")
+
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(complete_request(pipe, "user-b", "chat-b", "status please"), timeout)
+        except asyncio.TimeoutError:
+            failures.append("another user's request hung after a stream was dropped")
+        else:
+            print(f"next request after a dropped stream: {time.monotonic() - started:.3f}s")
+
+        # 2. Kept around but not read before its deadline
+        unread = await stream_request(pipe, "user-a", "chat-c", "summarize the open issues")
+        await asyncio.sleep(timeout + 0.2)
+        if pipe.admission.stats()["active"]:
+            failures.append("unread stream kept its admission slot past its deadline")
+        if "not read before its deadline" not in await drain(unread):
+            failures.append("stream read after its deadline did not report the error")
+
+        # 3. A duplicate of a request whose result never arrives
+        hung_flight = pipe.start_flight(pipe.get_flight_key("chat-d", "what changed today"), 3600)
+        started = time.monotonic()
+        try:
+            reply = await asyncio.wait_for(complete_request(pipe, "user-a", "chat-d", "what changed today"), timeout * 2)
+        except asyncio.TimeoutError:
+            failures.append("duplicate of a hung request waited past its own deadline")
+        else:
+            if "did not finish within" not in reply:
+                failures.append("duplicate of a hung request did not report the timeout")
+            print(f"duplicate of a hung request gave up after {time.monotonic() - started:.3f}s")
+        pipe.finish_flight(hung_flight)
+
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--pipe", default=DEFAULT_PIPE_PATH, help="Path to the pipe module")
+    parser.add_argument("--timeout", type=float, default=1.0, help="Request timeout used for the check")
+    args = parser.parse_args()
+
+    failures = asyncio.run(run(args.pipe, args.timeout))
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    if not failures:
+        print("OK: abandoned streams release their slot, flight and response; duplicates give up at their deadline")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Micro-benchmark for Pipe.analyze_request_complexity on long pasted inputs.
+
+Compares the previous approach (lowercase the message, then nested substring
+scans per keyword list) with the whole-word matcher on a short chat message, a
+pasted stack trace/log and a pasted source file, both scanning the whole
+message (the default) and with a --scan-chars head/tail window. The legacy
+scan also matches inside words, so its capabilities can differ.
+
+Usage:
+    python benchmarks/complexity_matcher.py --repeat 200
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from concurrent_chats import DEFAULT_PIPE_PATH, load_pipe_module
+
+
+def legacy_analyze(message: str, indicators: dict, multi_step_indicators: list) -> dict:
+    # The former Pipe.analyze_request_complexity
+    detected_capabilities = []
+    complexity_score = 0
+    message_lower = message.lower()
+    for capability, keywords in indicators.items():
+        if any(keyword in message_lower for keyword in keywords):
+            detected_capabilities.append(capability)
+            complexity_score += 1
+    requires_multi_step = any(indicator in message_lower for indicator in multi_step_indicators)
+    return {
+        "capabilities": detected_capabilities,
+        "complexity_score": complexity_score,
+        "requires_multi_step": requires_multi_step,
+        "estimated_duration": min(complexity_score * 15, 120)
+    }
+
+
+def sample_inputs() -> dict:
+    log_line = (
+        "2024-07-21T10:15:02.114Z INFO worker-3 queue=webhook job=8812 status=running "
+        "elapsed_ms=1834 node=HTTP_Request retries=0 payload_bytes=20311\n"
+    )
+    code_block = (
+        "def handle_event(self, payload: dict) -> dict:\n"
+        "    prefix = payload.get('prefix', '')\n"
+        "    for item in payload['items']:\n"
+        "        self.queue.put_nowait((prefix, item))\n"
+        "    return {'accepted': len(payload['items'])}\n\n"
+    )
+    return {
+        "short chat": "Can you explain how to create workflow for syncing the repo and then fix the error?",
+        "pasted log (200 KB)": "Here is our worker log, what is going on?\n" + log_line * 1300,
+        "pasted code (200 KB)": "Please review this module:\n" + code_block * 1100,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--pipe", default=DEFAULT_PIPE_PATH, help="Path to the pipe module")
+    parser.add_argument("--repeat", type=int, default=200, help="Iterations per input")
+    parser.add_argument("--scan-chars", type=int, default=16384, help="complexity_scan_chars for the windowed run")
+    args = parser.parse_args()
+
+    module = load_pipe_module(args.pipe)
+    full_scan_pipe = module.Pipe()
+    full_scan_pipe.valves.complexity_scan_chars = 0
+    windowed_pipe = module.Pipe()
+    windowed_pipe.valves.complexity_scan_chars = args.scan_chars
+    indicators = module.COMPLEXITY_INDICATORS
+    multi_step = module.MULTI_STEP_INDICATORS
+
+    for name, message in sample_inputs().items():
+        legacy = timeit.timeit(lambda: legacy_analyze(message, indicators, multi_step), number=args.repeat)
+        full_scan = timeit.timeit(
+            lambda: full_scan_pipe.analyze_request_complexity(message), number=args.repeat
+        )
+        windowed = timeit.timeit(lambda: windowed_pipe.analyze_request_complexity(message), number=args.repeat)
+        print(
+            f"{name:<22} {len(message) / 1024:7.1f} KiB | legacy {legacy / args.repeat * 1e6:9.1f} us"
+            f" | full scan {full_scan / args.repeat * 1e6:9.1f} us ({legacy / full_scan:5.1f}x)"
+            f" | window {windowed / args.repeat * 1e6:9.1f} us ({legacy / windowed:5.1f}x)"
+        )
+        print(f"{'':<22} legacy:     {legacy_analyze(message, indicators, multi_step)['capabilities']}")
+        print(f"{'':<22} whole word: {full_scan_pipe.analyze_request_complexity(message)['capabilities']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Checks that concurrent chats overlap inside the Jaguar pipe instead of queueing.
+
+Runs N simultaneous Pipe.pipe calls against a stub n8n webhook with a fixed
+latency. With a non-blocking transport the wall time stays close to a single
+request's latency; a blocking transport would take roughly N times as long.
+
+Usage:
+    python benchmarks/concurrent_chats.py --chats 20 --latency 0.5
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_n8n import StubN8NServer
+
+DEFAULT_PIPE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "openwebui_n8n_pipe.py"
+)
+
+
+def load_pipe_module(path: str):
+    spec = importlib.util.spec_from_file_location("pipe_under_test", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_event_emitter(chat_id: str, events: list):
+    # OpenWebUI emitters close over the request info dict, which the pipe inspects
+    request_info = {"chat_id": chat_id, "message_id": f"{chat_id}-msg"}
+
+    async def event_emitter(event: dict):
+        events.append((request_info["chat_id"], event))
+
+    return event_emitter
+
+
+async def run(pipe_path: str, chats: int, latency: float):
+    module = load_pipe_module(pipe_path)
+    pipe = module.Pipe()
+    events = []
+
+    async with StubN8NServer(latency=latency) as server:
+        pipe.valves.n8n_url = server.url
+
+        async def chat(index: int):
+            body = {"messages": [{"role": "user", "content": f"hello from chat {index}"}]}
+            return await pipe.pipe(
+                body, __user__={"id": f"user-{index}"},
+                __event_emitter__=make_event_emitter(f"chat-{index}", events)
+            )
+
+        started = time.perf_counter()
+        await asyncio.gather(*(chat(i) for i in range(chats)))
+        elapsed = time.perf_counter() - started
+
+    serial_estimate = chats * latency
+    print(f"chats:               {chats}")
+    print(f"stub latency:        {latency:.3f}s")
+    print(f"wall time:           {elapsed:.3f}s")
+    print(f"serial estimate:     {serial_estimate:.3f}s")
+    print(f"overlap factor:      {serial_estimate / elapsed:.1f}x")
+    print(f"connections opened:  {server.connections_opened}")
+    print(f"requests served:     {server.requests_served}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--pipe", default=DEFAULT_PIPE_PATH, help="Path to the pipe module")
+    parser.add_argument("--chats", type=int, default=20, help="Number of concurrent chats")
+    parser.add_argument("--latency", type=float, default=0.5, help="Stub n8n latency in seconds")
+    args = parser.parse_args()
+    asyncio.run(run(args.pipe, args.chats, args.latency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Checks that a webhook call gets the whole adaptive deadline it was promised.
+
+A buffered n8n webhook sends no bytes until the workflow finishes, so the
+pool's read_timeout must not cut a call short of its deadline. Against a stub
+webhook that answers after --latency seconds, with read_timeout set well
+below that, this check verifies that a request whose adaptive deadline covers
+the latency succeeds, and that one whose deadline is shorter still fails at
+its deadline. Exits non-zero on failure.
+
+Usage:
+    python benchmarks/deadline_budget.py --latency 2 --read-timeout 0.5
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from concurrent_chats import DEFAULT_PIPE_PATH, load_pipe_module, make_event_emitter
+from stub_n8n import StubN8NServer
+
+
+async def timed_request(pipe, chat_id: str, deadline: float) -> tuple:
+    pipe.valves.deadline_min = pipe.valves.deadline_max = deadline
+    body = {"messages": [{"role": "user", "content": f"summarize the backlog ({chat_id})"}]}
+    started = time.monotonic()
+    result = await pipe.pipe(body, __user__={"id": chat_id}, __event_emitter__=make_event_emitter(chat_id, []))
+    return result["messages"][-1]["content"], time.monotonic() - started
+
+
+async def run(pipe_path: str, latency: float, read_timeout: float) -> list:
+    failures = []
+    module = load_pipe_module(pipe_path)
+    pipe = module.Pipe()
+    pipe.valves.adaptive_deadlines = True
+    pipe.valves.read_timeout = read_timeout
+    pipe.valves.max_retries = 0
+
+    async with StubN8NServer(latency=latency) as server:
+        pipe.valves.n8n_url = server.url
+
+        reply, elapsed = await timed_request(pipe, "chat-long", latency * 2)
+        print(f"deadline {latency * 2:.1f}s: {elapsed:.2f}s, {'answered' if 'stub reply' in reply else 'failed'}")
+        if "stub reply" not in reply:
+            failures.append(f"request with a {latency * 2:.1f}s deadline was cut off after {elapsed:.2f}s")
+
+        reply, elapsed = await timed_request(pipe, "chat-short", latency / 2)
+        print(f"deadline {latency / 2:.1f}s: {elapsed:.2f}s, {'answered' if 'stub reply' in reply else 'failed'}")
+        if "timed out" not in reply:
+            failures.append(f"request with a {latency / 2:.1f}s deadline did not time out")
+        elif elapsed < latency / 2 * 0.9:
+            failures.append(f"request with a {latency / 2:.1f}s deadline gave up early, after {elapsed:.2f}s")
+
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--pipe", default=DEFAULT_PIPE_PATH, help="Path to the pipe module")
+    parser.add_argument("--latency", type=float, default=2.0, help="Stub n8n latency in seconds")
+    parser.add_argument("--read-timeout", type=float, default=0.5, help="read_timeout valve, below the latency")
+    args = parser.parse_args()
+
+    failures = asyncio.run(run(args.pipe, args.latency, args.read_timeout))
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    if not failures:
+        print("OK: webhook calls get their full deadline regardless of read_timeout")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Offline load test for the OpenWebUI n8n pipes against a stub n8n webhook.
+
+Drives a fixed number of Pipe.pipe calls at a given concurrency through the
+stub server (latency distribution, error rate and streaming are configurable)
+with fake event emitters, and reports throughput, end-to-end latency
+percentiles, time to first streamed chunk and how long the event loop was
+blocked while the requests ran. The stub runs on its own thread so a pipe
+that blocks its event loop shows up as loop lag instead of starving the
+stub. Works with any pipe module exposing a
+``Pipe`` class with an ``n8n_url`` valve, e.g. ``local-ai-packaged/n8n_pipe.py``.
+
+Usage:
+    python benchmarks/loadtest.py --requests 500 --concurrency 50 --latency 0.2
+    python benchmarks/loadtest.py --distribution lognormal --error-rate 0.05 --stream
+    python benchmarks/loadtest.py --pipe ../local-ai-packaged/n8n_pipe.py --max-loop-block 0.1
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from concurrent_chats import DEFAULT_PIPE_PATH, load_pipe_module, make_event_emitter
+from stub_n8n import LATENCY_DISTRIBUTIONS, StubN8NServer, serve_in_thread
+
+
+def percentile(samples: list, fraction: float) -> float:
+    """Nearest-rank percentile of ``samples``; 0.0 when there are none."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes a task that sleeps ``interval`` at a time.
+
+    Any lateness means something ran on the loop without yielding, e.g. a
+    blocking HTTP call or a long synchronous parse inside the pipe.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.lags = []
+        self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            try:
+                await asyncio.sleep(self.interval)
+            finally:
+                # Also counts a block that was still running when the monitor got cancelled
+                self.lags.append(max(0.0, time.perf_counter() - started - self.interval))
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+    @property
+    def blocked_seconds(self) -> float:
+        # Ignore scheduler noise below a millisecond
+        return sum(lag for lag in self.lags if lag >= 0.001)
+
+
+async def run_request(pipe, index: int, chats: int, stream: bool) -> dict:
+    events = []
+    chat_id = f"chat-{index % chats}"
+    # Unique messages so response caching and request coalescing stay out of the measurement
+    body = {
+        "stream": stream,
+        "messages": [{"role": "user", "content": f"load test request {index}: summarize the status"}],
+    }
+    started = time.perf_counter()
+    first_chunk = None
+    try:
+        result = await pipe.pipe(
+            body, __user__={"id": f"user-{index % chats}"},
+            __event_emitter__=make_event_emitter(chat_id, events)
+        )
+        if hasattr(result, "__aiter__"):
+            async for _ in result:
+                if first_chunk is None:
+                    first_chunk = time.perf_counter() - started
+        failed = (isinstance(result, dict) and "error" in result) or any(
+            event.get("type") == "status" and event["data"].get("level") == "error"
+            for _, event in events
+        )
+    except Exception:
+        failed = True
+    return {"latency": time.perf_counter() - started, "first_chunk": first_chunk, "failed": failed}
+
+
+async def run(args) -> dict:
+    module = load_pipe_module(args.pipe)
+    pipe = module.Pipe()
+    if hasattr(pipe.valves, "enable_streaming"):
+        pipe.valves.enable_streaming = args.stream
+
+    server = StubN8NServer(
+        latency=args.latency, stream=args.stream, distribution=args.distribution,
+        error_rate=args.error_rate, error_status=args.error_status, seed=args.seed,
+    )
+    with serve_in_thread(server):
+        pipe.valves.n8n_url = server.url
+        limit = asyncio.Semaphore(args.concurrency)
+
+        async def limited(index: int):
+            async with limit:
+                return await run_request(pipe, index, args.chats, args.stream)
+
+        # Keep one-off costs (client and TLS context setup, first imports) out of the numbers
+        for index in range(args.warmup):
+            await run_request(pipe, -1 - index, args.chats, args.stream)
+        baseline = (server.requests_served, server.errors_served, server.connections_opened)
+
+        monitor = LoopLagMonitor()
+        monitor.start()
+        started = time.perf_counter()
+        results = await asyncio.gather(*(limited(i) for i in range(args.requests)))
+        elapsed = time.perf_counter() - started
+        await monitor.stop()
+
+    latencies = [result["latency"] for result in results]
+    first_chunks = [result["first_chunk"] for result in results if result["first_chunk"] is not None]
+    return {
+        "pipe": os.path.basename(args.pipe),
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "distribution": args.distribution,
+        "stub_latency": args.latency,
+        "stream": args.stream,
+        "wall_time": elapsed,
+        "throughput": args.requests / elapsed if elapsed else 0.0,
+        "errors": sum(result["failed"] for result in results),
+        "stub_errors": server.errors_served - baseline[1],
+        "upstream_requests": server.requests_served - baseline[0],
+        "connections_opened": server.connections_opened - baseline[2],
+        "latency_p50": percentile(latencies, 0.50),
+        "latency_p95": percentile(latencies, 0.95),
+        "latency_p99": percentile(latencies, 0.99),
+        "latency_max": max(latencies, default=0.0),
+        "first_chunk_p50": percentile(first_chunks, 0.50),
+        "first_chunk_p95": percentile(first_chunks, 0.95),
+        "loop_lag_p99": percentile(monitor.lags, 0.99),
+        "loop_lag_max": max(monitor.lags, default=0.0),
+        "loop_blocked": monitor.blocked_seconds,
+    }
+
+
+def print_report(report: dict):
+    print(f"pipe:                {report['pipe']}")
+    print(
+        f"workload:            {report['requests']} requests, concurrency {report['concurrency']},"
+        f" {report['distribution']} latency mean {report['stub_latency']:.3f}s"
+        f"{', streaming' if report['stream'] else ''}"
+    )
+    print(f"wall time:           {report['wall_time']:.3f}s")
+    print(f"throughput:          {report['throughput']:.1f} req/s")
+    print(
+        f"errors:              {report['errors']} seen by chats,"
+        f" {report['stub_errors']} injected of {report['upstream_requests']} upstream requests"
+    )
+    print(f"connections opened:  {report['connections_opened']}")
+    print(
+        f"latency:             p50 {report['latency_p50'] * 1000:.1f} ms | p95 {report['latency_p95'] * 1000:.1f} ms"
+        f" | p99 {report['latency_p99'] * 1000:.1f} ms | max {report['latency_max'] * 1000:.1f} ms"
+    )
+    if report["stream"]:
+        print(
+            f"first chunk:         p50 {report['first_chunk_p50'] * 1000:.1f} ms"
+            f" | p95 {report['first_chunk_p95'] * 1000:.1f} ms"
+        )
+    print(
+        f"event loop:          blocked {report['loop_blocked'] * 1000:.1f} ms in total"
+        f" | lag p99 {report['loop_lag_p99'] * 1000:.1f} ms | max {report['loop_lag_max'] * 1000:.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--pipe", default=DEFAULT_PIPE_PATH, help="Path to the pipe module")
+    parser.add_argument("--requests", type=int, default=200, help="Total pipe calls")
+    parser.add_argument("--concurrency", type=int, default=20, help="Pipe calls in flight at once")
+    parser.add_argument("--chats", type=int, default=50, help="Distinct chat ids the calls are spread over")
+    parser.add_argument("--latency", type=float, default=0.2, help="Mean stub latency in seconds")
+    parser.add_argument("--distribution", choices=LATENCY_DISTRIBUTIONS, default="fixed",
+                        help="Stub latency distribution")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of stub requests that fail")
+    parser.add_argument("--error-status", type=int, default=500, help="HTTP status for injected failures")
+    parser.add_argument("--stream", action="store_true", help="Stub answers with an NDJSON token stream")
+    parser.add_argument("--warmup", type=int, default=1, help="Unmeasured calls made before the run")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for latency and error sampling")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--max-p95", type=float, default=None,
+                        help="Exit non-zero if p95 latency exceeds this many seconds")
+    parser.add_argument("--max-loop-block", type=float, default=None,
+                        help="Exit non-zero if the event loop was blocked longer than this many seconds")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+    failures = []
+    if args.max_p95 is not None and report["latency_p95"] > args.max_p95:
+        failures.append(f"p95 latency {report['latency_p95']:.3f}s exceeds {args.max_p95:.3f}s")
+    if args.max_loop_block is not None and report["loop_blocked"] > args.max_loop_block:
+        failures.append(f"event loop blocked {report['loop_blocked']:.3f}s, limit {args.max_loop_block:.3f}s")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
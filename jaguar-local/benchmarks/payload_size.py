@@ -0,0 +1,70 @@
+"""
+Compares Jaguar payload sizes and encode times in 'full' and 'delta' payload modes.
+
+Replays a multi-turn session through the pipe's own payload building and
+learning bookkeeping (no network), acknowledging each turn the way a
+successful n8n call would, and reports per-turn and total bytes sent.
+
+Usage:
+    python benchmarks/payload_size.py --turns 50 --response-chars 2000
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from concurrent_chats import DEFAULT_PIPE_PATH, load_pipe_module
+
+
+async def replay_session(module, mode: str, turns: int, response_chars: int):
+    pipe = module.Pipe()
+    pipe.valves.payload_mode = mode
+    session_id = f"bench-{mode}"
+    sizes = []
+    encode_time = 0.0
+
+    for turn in range(turns):
+        user_message = f"Turn {turn}: how do I document the workflow for the onboarding agent?"
+        analysis = pipe.analyze_request_complexity(user_message)
+        payload = pipe.build_payload(user_message, session_id, f"msg-{turn}", {}, analysis, False)
+
+        started = time.perf_counter()
+        encoded = module.encode_json(payload)
+        encode_time += time.perf_counter() - started
+        sizes.append(len(encoded))
+
+        response = f"Answer {turn}: " + ("lorem ipsum " * (response_chars // 12))
+        pipe.acknowledge_session_version(session_id, payload, {"output": response})
+        await pipe.record_interaction(session_id, user_message, response, analysis, None)
+
+    return sizes, encode_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--pipe", default=DEFAULT_PIPE_PATH, help="Path to the pipe module")
+    parser.add_argument("--turns", type=int, default=50, help="Turns in the simulated session")
+    parser.add_argument("--response-chars", type=int, default=2000, help="Approximate response length")
+    args = parser.parse_args()
+
+    module = load_pipe_module(args.pipe)
+    print(f"encoder: {'orjson' if module.orjson is not None else 'json'}")
+    results = {}
+    for mode in ("full", "delta"):
+        sizes, encode_time = asyncio.run(
+            replay_session(module, mode, args.turns, args.response_chars)
+        )
+        results[mode] = sum(sizes)
+        print(
+            f"{mode:>5}: total {sum(sizes) / 1024:9.1f} KiB | last turn {sizes[-1] / 1024:7.1f} KiB"
+            f" | max {max(sizes) / 1024:7.1f} KiB | encode {encode_time * 1000:7.2f} ms"
+        )
+    print(f"reduction: {results['full'] / results['delta']:.1f}x fewer bytes in delta mode")
+
+
+if __name__ == "__main__":
+    main()
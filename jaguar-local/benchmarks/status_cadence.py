@@ -0,0 +1,144 @@
+"""
+Checks that status updates are throttled per chat, not across all chats.
+
+Simulates N chats calling Pipe.emit_status at the same time, each sending a
+progress update every --tick seconds for --duration seconds. Every other chat
+also reports an error halfway through, and every chat ends with a final
+status. For each chat the check verifies that:
+
+- its first update is delivered right away, whatever the other chats are doing
+- its delivered progress updates are at least emit_interval apart and it gets
+  about one per interval (its own cadence, not a share of a global one)
+- error and final statuses are delivered immediately, and nothing after the
+  final status
+
+Exits non-zero if any chat fails.
+
+Usage:
+    python benchmarks/status_cadence.py --chats 50 --interval 0.2
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from concurrent_chats import DEFAULT_PIPE_PATH, load_pipe_module
+
+
+def make_recording_emitter(chat_id: str, received: list):
+    # Same shape as an OpenWebUI emitter, which the pipe inspects for the chat ID
+    request_info = {"chat_id": chat_id, "message_id": f"{chat_id}-msg"}
+
+    async def event_emitter(event: dict):
+        received.append((time.monotonic(), event["data"]))
+
+    return event_emitter
+
+
+async def simulate_chat(pipe, chat_id: str, fails: bool, tick: float, duration: float, offset: float):
+    received = []
+    sent = {}
+    emitter = make_recording_emitter(chat_id, received)
+
+    async def send(level: str, message: str, done: bool):
+        sent[message] = time.monotonic()
+        await pipe.emit_status(emitter, level, message, done)
+
+    await asyncio.sleep(offset)
+    started = time.monotonic()
+    update = 0
+    while time.monotonic() - started < duration:
+        await send("info", f"{chat_id} update {update}", False)
+        update += 1
+        if fails and update == int(duration / tick / 2):
+            await send("error", f"{chat_id} step failed", False)
+        await asyncio.sleep(tick)
+    await send("error" if fails else "success", f"{chat_id} finished", True)
+    # Give a wrongly scheduled flush the chance to show up after the final status
+    await asyncio.sleep(pipe.valves.emit_interval * 2)
+    return sent, received
+
+
+def check_chat(chat_id: str, fails: bool, sent: dict, received: list, interval: float, duration: float, tolerance: float) -> list:
+    failures = []
+    progress = [(at, data) for at, data in received if not data["done"] and data["level"] == "info"]
+    descriptions = [data["description"] for _, data in received]
+
+    if not progress or progress[0][1]["description"] != f"{chat_id} update 0":
+        failures.append(f"{chat_id}: first update was not delivered")
+    elif progress[0][0] - sent[f"{chat_id} update 0"] > tolerance:
+        failures.append(f"{chat_id}: first update was held back {progress[0][0] - sent[f'{chat_id} update 0']:.3f}s")
+
+    gaps = [later[0] - earlier[0] for earlier, later in zip(progress, progress[1:])]
+    if gaps and min(gaps) < interval - tolerance:
+        failures.append(f"{chat_id}: progress updates only {min(gaps):.3f}s apart")
+    expected = int(duration / interval)
+    if len(progress) < expected:
+        failures.append(f"{chat_id}: {len(progress)} progress updates delivered, expected at least {expected}")
+
+    for message in ([f"{chat_id} step failed"] if fails else []) + [f"{chat_id} finished"]:
+        if message not in descriptions:
+            failures.append(f"{chat_id}: '{message}' was suppressed")
+            continue
+        delivered_at = next(at for at, data in received if data["description"] == message)
+        if delivered_at - sent[message] > tolerance:
+            failures.append(f"{chat_id}: '{message}' was delayed {delivered_at - sent[message]:.3f}s")
+    if descriptions and descriptions[-1] != f"{chat_id} finished":
+        failures.append(f"{chat_id}: '{descriptions[-1]}' was delivered after the final status")
+    return failures
+
+
+async def run(pipe_path: str, chats: int, interval: float, tick: float, duration: float, tolerance: float, seed: int):
+    module = load_pipe_module(pipe_path)
+    pipe = module.Pipe()
+    pipe.valves.emit_interval = interval
+    rng = random.Random(seed)
+
+    chat_ids = [f"chat-{index}" for index in range(chats)]
+    results = await asyncio.gather(*(
+        simulate_chat(pipe, chat_id, index % 2 == 1, tick, duration, rng.uniform(0, interval))
+        for index, chat_id in enumerate(chat_ids)
+    ))
+
+    failures = []
+    delivered = 0
+    for index, (chat_id, (sent, received)) in enumerate(zip(chat_ids, results)):
+        failures.extend(check_chat(chat_id, index % 2 == 1, sent, received, interval, duration, tolerance))
+        delivered += len(received)
+
+    print(f"chats:               {chats}")
+    print(f"emit interval:       {interval:.3f}s")
+    print(f"updates sent:        {sum(len(sent) for sent, _ in results)}")
+    print(f"updates delivered:   {delivered}")
+    print(f"throttle state left: {len(pipe._status_state)}")
+    if pipe._status_state:
+        failures.append(f"{len(pipe._status_state)} chats kept throttle state after their final status")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--pipe", default=DEFAULT_PIPE_PATH, help="Path to the pipe module")
+    parser.add_argument("--chats", type=int, default=50, help="Number of concurrent chats")
+    parser.add_argument("--interval", type=float, default=0.2, help="emit_interval used for the check")
+    parser.add_argument("--tick", type=float, default=0.02, help="Seconds between a chat's progress updates")
+    parser.add_argument("--duration", type=float, default=1.0, help="Seconds each chat keeps sending updates")
+    parser.add_argument("--tolerance", type=float, default=0.05, help="Allowed scheduling delay in seconds")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    failures = asyncio.run(run(args.pipe, args.chats, args.interval, args.tick, args.duration, args.tolerance, args.seed))
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    if not failures:
+        print(f"OK: each of {args.chats} chats kept its own status cadence")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Minimal stand-in for an n8n webhook, used by the pipe benchmarks.
+
+Speaks just enough HTTP/1.1 (keep-alive, Content-Length and chunked bodies)
+to answer POSTs from the OpenWebUI pipes with a canned JSON body after a
+delay, or with an n8n-style NDJSON token stream, so the pipes can be
+exercised without a running n8n instance. Delays can be fixed or drawn from
+a uniform, exponential or lognormal distribution around ``latency``, and a
+fraction of requests can be failed with an HTTP error.
+"""
+
+import asyncio
+import contextlib
+import json
+import math
+import random
+import threading
+from typing import Optional
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+
+
+class StubN8NServer:
+    def __init__(
+        self,
+        latency: float = 0.5,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        stream: bool = False,
+        stream_chunks: int = 20,
+        distribution: str = "fixed",
+        error_rate: float = 0.0,
+        error_status: int = 500,
+        seed: Optional[int] = None,
+    ):
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {distribution}")
+        self.latency = latency
+        self.distribution = distribution
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._random = random.Random(seed)
+        self.stream = stream
+        self.stream_chunks = stream_chunks
+        self.host = host
+        self.port = port
+        self.requests_served = 0
+        self.errors_served = 0
+        self.connections_opened = 0
+        self._server = None
+        self._handlers = set()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/webhook/jaguar-agent"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            # Idle keep-alive connections would otherwise hold wait_closed() open
+            for handler in list(self._handlers):
+                handler.cancel()
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+            await self._server.wait_closed()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    async def _read_request(self, reader):
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0))
+        body = await reader.readexactly(length) if length else b""
+        method, path, _ = request_line.decode("latin-1").split(" ", 2)
+        return method, path, headers, body
+
+    def sample_latency(self) -> float:
+        """Draws one response delay; every distribution has ``latency`` as its mean."""
+        if self.latency <= 0 or self.distribution == "fixed":
+            return max(0.0, self.latency)
+        if self.distribution == "uniform":
+            return self._random.uniform(0, 2 * self.latency)
+        if self.distribution == "exponential":
+            return self._random.expovariate(1 / self.latency)
+        # Long-tailed: sigma=1 puts p99 at roughly 6x the mean
+        sigma = 1.0
+        return self._random.lognormvariate(math.log(self.latency) - sigma ** 2 / 2, sigma)
+
+    async def _write_json(self, writer, data: dict, status: int = 200):
+        response = json.dumps(data).encode()
+        reason = "OK" if status == 200 else "Error"
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\n".encode()
+            + b"Content-Type: application/json\r\n"
+            + f"Content-Length: {len(response)}\r\n\r\n".encode()
+            + response
+        )
+        await writer.drain()
+
+    async def _write_stream(self, writer, reply: str, latency: float):
+        # Spread the latency over the stream like a model emitting tokens
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: application/x-ndjson\r\n"
+            b"Transfer-Encoding: chunked\r\n\r\n"
+        )
+        words = reply.split(" ")
+        per_chunk = max(1, -(-len(words) // self.stream_chunks))
+        pieces = [" ".join(words[i:i + per_chunk]) + " " for i in range(0, len(words), per_chunk)]
+        events = [{"type": "begin"}]
+        events += [{"type": "item", "content": piece} for piece in pieces]
+        events += [{"type": "end"}]
+        delay = latency / max(1, len(events))
+        for event in events:
+            await asyncio.sleep(delay)
+            line = (json.dumps(event) + "\n").encode()
+            writer.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+            await writer.drain()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def _handle_connection(self, reader, writer):
+        self.connections_opened += 1
+        handler = asyncio.current_task()
+        self._handlers.add(handler)
+        try:
+            while request := await self._read_request(reader):
+                _, _, _, body = request
+                payload = json.loads(body or b"{}")
+                reply = f"stub reply to: {payload.get('chatInput', '')}"
+                latency = self.sample_latency()
+                if self._random.random() < self.error_rate:
+                    await asyncio.sleep(latency)
+                    await self._write_json(writer, {"message": "stub failure"}, self.error_status)
+                    self.errors_served += 1
+                elif self.stream:
+                    await self._write_stream(writer, reply, latency)
+                else:
+                    await asyncio.sleep(latency)
+                    await self._write_json(writer, {"output": reply})
+                self.requests_served += 1
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            self._handlers.discard(handler)
+            writer.close()
+
+
+@contextlib.contextmanager
+def serve_in_thread(server: StubN8NServer):
+    """Runs ``server`` on its own event loop in a daemon thread.
+
+    Pipes that block their event loop (e.g. synchronous ``requests.post``)
+    would otherwise starve a stub sharing that loop and never get an answer.
+    """
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, name="stub-n8n", daemon=True)
+    thread.start()
+    try:
+        asyncio.run_coroutine_threadsafe(server.start(), loop).result()
+        yield server
+    finally:
+        asyncio.run_coroutine_threadsafe(server.stop(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
@@ -3,21 +3,1099 @@ title: Jaguar N8N AGI Pipe Function
 author: The Spatial Network
 author_url: https://thespatialnetwork.net
 version: 2.0.0
+requirements: httpx
 
 Advanced OpenWebUI Pipe Function for Jaguar AI Developer Agent
 Enhanced with dynamic workflow generation, self-improvement capabilities,
 and comprehensive AGI features for The Spatial Network ecosystem.
 """
 
-from typing import Optional, Callable, Awaitable, Dict, List, Any
+from typing import Optional, Callable, Awaitable, AsyncGenerator, Dict, List, Any, Tuple, Union
 from pydantic import BaseModel, Field
 import os
 import time
-import requests
+import httpx
 import json
+import math
+import re
 import asyncio
+import atexit
+import contextlib
+import hashlib
+import random
+import sqlite3
+import threading
+import weakref
+from collections import OrderedDict, deque
 from datetime import datetime, timezone
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+RETRYABLE_STATUS_CODES = {429, 502, 503, 504}
+# A gateway answering 502/504 has usually forwarded the POST already, so the workflow may be running
+GATEWAY_STATUS_CODES = {502, 504}
+FAILED_EXECUTION_STATUSES = {"error", "crashed", "canceled"}
+
+def json_default(value: Any) -> Any:
+    """Serialize session values (e.g. capability sets) that plain JSON rejects."""
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    return str(value)
+
+def encode_json(value: Any) -> bytes:
+    """Compact JSON encoding, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(value, default=json_default)
+    return json.dumps(value, default=json_default, separators=(",", ":")).encode()
+
+def trim_oldest_interactions(learning_entry: Dict[str, Any]) -> bool:
+    """Drop the oldest quarter of a session's interactions; False when nothing is left to drop."""
+    interactions = learning_entry.get("interactions", [])
+    if not interactions:
+        return False
+    del interactions[:max(1, len(interactions) // 4)]
+    return True
+
+class SessionStore:
+    """Per-chat state with an LRU session cap, idle TTL and a per-session byte budget.
+
+    Entries are plain dicts mutated in place by the pipe; call ``commit`` after a
+    mutation so the entry's size is re-measured and the budget enforced. Subclasses
+    can override ``ensure_loaded`` and ``persist`` to back the store with durable storage.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 1000,
+        idle_ttl: float = 86400,
+        max_bytes_per_session: int = 262144,
+        trim: Optional[Callable[[Any], bool]] = None
+    ):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_bytes_per_session = max_bytes_per_session
+        self.trim = trim
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._last_access: Dict[str, float] = {}
+        self._sizes: Dict[str, int] = {}
+        self.counters = {
+            "lru_evictions": 0,
+            "ttl_evictions": 0,
+            "budget_trims": 0,
+            "budget_evictions": 0
+        }
+
+    def configure(self, max_sessions: int, idle_ttl: float, max_bytes_per_session: int):
+        """Apply current valve limits and drop anything they now exclude."""
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_bytes_per_session = max_bytes_per_session
+        self.evict_expired()
+        self._evict_over_capacity()
+
+    async def ensure_loaded(self, key: str):
+        """Hook for durable stores: bring a chat's entry into memory before it is used."""
+
+    def persist(self, key: str, value: Optional[Any]):
+        """Hook for durable stores: record a committed entry, or its removal when None."""
+
+    def close(self):
+        """Hook for durable stores: write pending state and release the backing storage."""
+
+    def _is_expired(self, key: str, now: float) -> bool:
+        return self.idle_ttl > 0 and now - self._last_access.get(key, now) > self.idle_ttl
+
+    def _touch(self, key: str):
+        self._entries.move_to_end(key)
+        self._last_access[key] = time.monotonic()
+
+    def _drop(self, key: str):
+        self._entries.pop(key, None)
+        self._last_access.pop(key, None)
+        self._sizes.pop(key, None)
+
+    def evict_expired(self):
+        """Drop idle sessions; the LRU order means expired entries sit at the front."""
+        now = time.monotonic()
+        while self._entries:
+            key = next(iter(self._entries))
+            if not self._is_expired(key, now):
+                break
+            self._drop(key)
+            self.counters["ttl_evictions"] += 1
+
+    def _evict_over_capacity(self):
+        while len(self._entries) > max(self.max_sessions, 1):
+            key = next(iter(self._entries))
+            self._drop(key)
+            self.counters["lru_evictions"] += 1
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def items(self) -> List[Tuple[str, Any]]:
+        return list(self._entries.items())
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self._entries and self._is_expired(key, time.monotonic()):
+            self._drop(key)
+            self.counters["ttl_evictions"] += 1
+        if key not in self._entries:
+            return default
+        self._touch(key)
+        return self._entries[key]
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: Any):
+        self._entries[key] = value
+        self._touch(key)
+        self._evict_over_capacity()
+
+    def __delitem__(self, key: str):
+        self._drop(key)
+        self.persist(key, None)
+
+    def commit(self, key: str):
+        """Re-measure an entry after mutation, trimming or evicting it if over budget."""
+        if key not in self._entries:
+            return
+        value = self._entries[key]
+        size = len(encode_json(value))
+        while size > self.max_bytes_per_session > 0 and self.trim and self.trim(value):
+            self.counters["budget_trims"] += 1
+            size = len(encode_json(value))
+        if size > self.max_bytes_per_session > 0:
+            self._drop(key)
+            self.persist(key, None)
+            self.counters["budget_evictions"] += 1
+            return
+        self._sizes[key] = size
+        self.persist(key, value)
+
+    def stats(self) -> Dict[str, Any]:
+        """Session count, tracked bytes and eviction counters for monitoring."""
+        return {
+            "sessions": len(self._entries),
+            "bytes": sum(self._sizes.values()),
+            **self.counters
+        }
+
+class SQLiteSessionStore(SessionStore):
+    """SessionStore persisted to a local SQLite database in WAL mode.
+
+    Committed entries are marked dirty and written in batches by a background
+    task, so the request path never waits on disk. A chat's state is read back
+    only when its id is first seen, and entries held in memory are re-checked
+    against the database periodically so several OpenWebUI workers converge.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        namespace: str,
+        flush_interval: float = 2.0,
+        revalidate_interval: float = 5.0,
+        retention: float = 30 * 86400,
+        **kwargs
+    ):
+        super().__init__(**kwargs)
+        self.path = path
+        self.namespace = namespace
+        self.flush_interval = flush_interval
+        self.revalidate_interval = revalidate_interval
+        self.retention = retention
+        self._dirty: Dict[str, Optional[Any]] = {}
+        self._synced: Dict[str, Tuple[float, float]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._closed = False
+        self._db_lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS session_state ("
+            "namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, "
+            "updated_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+        )
+        self.counters.update({"disk_loads": 0, "disk_reloads": 0, "flushes": 0, "rows_written": 0})
+        atexit.register(self.flush_now)
+
+    def _read_row(self, key: str, updated_after: float = 0.0) -> Optional[Tuple[bytes, float]]:
+        with self._db_lock:
+            return self._connection.execute(
+                "SELECT value, updated_at FROM session_state "
+                "WHERE namespace = ? AND key = ? AND updated_at > ?",
+                (self.namespace, key, updated_after)
+            ).fetchone()
+
+    async def ensure_loaded(self, key: str):
+        if key in self._dirty:
+            if key not in self._entries and self._dirty[key] is not None:
+                self._entries[key] = self._dirty[key]
+                self._evict_over_capacity()
+            return
+        
+        now = time.monotonic()
+        in_memory = key in self._entries
+        last_synced_at, last_checked = self._synced.get(key, (0.0, 0.0))
+        if in_memory and now - last_checked < self.revalidate_interval:
+            return
+        
+        row = await asyncio.to_thread(self._read_row, key, last_synced_at if in_memory else 0.0)
+        self._synced[key] = (row[1] if row else last_synced_at, now)
+        if row is None or key in self._dirty:
+            return
+        self._entries[key] = json.loads(row[0])
+        self._touch(key)
+        self._evict_over_capacity()
+        self.counters["disk_reloads" if in_memory else "disk_loads"] += 1
+
+    def persist(self, key: str, value: Optional[Any]):
+        if self._closed:
+            return
+        self._dirty[key] = value
+        if self._flush_task is None or self._flush_task.done():
+            try:
+                self._flush_task = asyncio.get_running_loop().create_task(self._flush_loop())
+            except RuntimeError:
+                pass  # No running loop; the atexit hook writes whatever is pending
+
+    def _drop(self, key: str):
+        super()._drop(key)
+        if key not in self._dirty:
+            self._synced.pop(key, None)
+
+    def _write_batch(self, batch: Dict[str, Optional[bytes]], written_at: float):
+        with self._db_lock:
+            self._connection.execute("BEGIN")
+            try:
+                for key, value in batch.items():
+                    if value is None:
+                        self._connection.execute(
+                            "DELETE FROM session_state WHERE namespace = ? AND key = ?",
+                            (self.namespace, key)
+                        )
+                    else:
+                        self._connection.execute(
+                            "INSERT INTO session_state (namespace, key, value, updated_at) "
+                            "VALUES (?, ?, ?, ?) ON CONFLICT (namespace, key) "
+                            "DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+                            (self.namespace, key, value, written_at)
+                        )
+                if self.retention > 0:
+                    self._connection.execute(
+                        "DELETE FROM session_state WHERE namespace = ? AND updated_at < ?",
+                        (self.namespace, written_at - self.retention)
+                    )
+                self._connection.execute("COMMIT")
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+
+    def _take_batch(self) -> Tuple[Dict[str, Optional[bytes]], float]:
+        # Encode in the caller's thread so entries are not mutated mid-serialization
+        batch = {
+            key: None if value is None else encode_json(value)
+            for key, value in self._dirty.items()
+        }
+        self._dirty.clear()
+        return batch, time.time()
+
+    def _mark_synced(self, batch: Dict[str, Optional[bytes]], written_at: float):
+        now = time.monotonic()
+        for key in batch:
+            self._synced[key] = (written_at, now)
+        self.counters["flushes"] += 1
+        self.counters["rows_written"] += len(batch)
+
+    async def _flush_loop(self):
+        while self._dirty:
+            await asyncio.sleep(self.flush_interval)
+            batch, written_at = self._take_batch()
+            try:
+                await asyncio.to_thread(self._write_batch, batch, written_at)
+            except sqlite3.Error:
+                # Keep the batch for the next attempt unless newer state replaced it
+                for key, value in batch.items():
+                    self._dirty.setdefault(key, None if value is None else json.loads(value))
+                continue
+            self._mark_synced(batch, written_at)
+
+    def flush_now(self):
+        """Synchronously write all pending state, e.g. at interpreter shutdown."""
+        if not self._dirty:
+            return
+        batch, written_at = self._take_batch()
+        self._write_batch(batch, written_at)
+        self._mark_synced(batch, written_at)
+
+    def close(self):
+        """Write pending state, then close the database and drop the shutdown hook."""
+        if self._closed:
+            return
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+        # Waits for a batch being written in a worker thread before writing the rest
+        self.flush_now()
+        self._closed = True
+        atexit.unregister(self.flush_now)
+        with self._db_lock:
+            self._connection.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "dirty": len(self._dirty)}
+
+COMPLEXITY_INDICATORS = {
+    "workflow_creation": ["create workflow", "build workflow", "new workflow", "workflow for"],
+    "github_operations": ["github", "repository", "repo", "commit", "pull request", "issue"],
+    "code_generation": ["write code", "create function", "implement", "develop"],
+    "documentation": ["document", "explain", "how to", "tutorial", "guide"],
+    "debugging": ["debug", "fix", "error", "problem", "issue", "troubleshoot"],
+    "optimization": ["optimize", "improve", "enhance", "better", "performance"],
+    "learning": ["learn", "understand", "analyze", "study", "research"]
+}
+
+MULTI_STEP_INDICATORS = ["and then", "after that", "next", "also", "additionally"]
+
+# Endings a capability keyword may take and still count ("errored", "researches", "documentation")
+KEYWORD_SUFFIXES = ["s", "es", "ed", "ing", "er", "ers", "ion", "ions", "ation", "ations", "ment", "ments"]
+
+def keyword_pattern(keyword: str, inflect: bool = True) -> Tuple[str, str]:
+    """Literal prefix and regex matching ``keyword`` as a whole word, inflected unless ``inflect`` is off.
+
+    The regex starts with the literal so the engine can search for it directly; the
+    start-of-word check is a lookbehind placed after it. Words of a phrase are
+    separated by single spaces, as in the substring scan this replaced.
+    """
+    words = keyword.split()
+    head, last = words[:-1], words[-1]
+    endings: List[str] = []
+    if inflect and last.endswith("e"):
+        # "improve" -> improves, improved, improving, improvement
+        last, endings = last[:-1], ["e"] + [suffix for suffix in KEYWORD_SUFFIXES if suffix[0] in "aeiou"] + ["ement", "ements"]
+    elif inflect and last.endswith("y") and last[-2:-1] not in "aeiou":
+        # "study" -> studies, studied, studying
+        last, endings = last[:-1], ["y", "ies", "ied", "ying"]
+    elif inflect:
+        # "commit" -> committed, "debug" -> debugging
+        endings = [""] + KEYWORD_SUFFIXES + [last[-1] + suffix for suffix in ("ed", "ing", "er", "ers")]
+    literal = " ".join(head + [last])
+    pattern = re.escape(literal) + rf"(?<![a-z0-9_]{re.escape(literal)})"
+    if endings:
+        # Longest first; a stem cut short ("improv") only matches with one of its endings
+        pattern += "(?:" + "|".join(sorted(map(re.escape, endings), key=len, reverse=True)) + ")"
+    return literal, pattern + r"(?![a-z0-9_])"
+
+class KeywordMatcher:
+    """Capability detection with whole-word keyword matching.
+
+    Keywords match as whole words with an optional common inflection, so "fixing"
+    and "errored" count but "prefix" and "report" (for "repo") do not. Each keyword
+    is first looked up with a plain substring search, the same work as the former
+    ``in`` scan, and only hits are confirmed with the keyword's regex.
+    """
+
+    def __init__(self, indicators: Dict[str, List[str]], multi_step_indicators: List[str]):
+        self.capability_order = list(indicators)
+        # (literal, regex search, capability); multi-step indicators are filed under None
+        keywords: List[Tuple[str, Callable, Optional[str]]] = []
+        patterns: Dict[str, Tuple[str, Callable]] = {}
+        for capability, capability_keywords in indicators.items():
+            for keyword in capability_keywords:
+                if keyword not in patterns:
+                    literal, pattern = keyword_pattern(keyword)
+                    patterns[keyword] = (literal, re.compile(pattern).search)
+                keywords.append((*patterns[keyword], capability))
+        for indicator in multi_step_indicators:
+            literal, pattern = keyword_pattern(indicator, inflect=False)
+            keywords.append((literal, re.compile(pattern).search, None))
+        
+        # Keywords behind a common guard ("workflow" for four phrases, "repo" for "repository")
+        # are all skipped after one scan when the guard is missing
+        literals = [literal for literal, _, _ in keywords]
+        guarded: Dict[str, List[Tuple[str, Callable, Optional[str]]]] = {}
+        for keyword in keywords:
+            guarded.setdefault(self._guard(keyword[0], literals), []).append(keyword)
+        self.guards = [
+            (guard if len(group) > 1 else group[0][0], group) for guard, group in guarded.items()
+        ]
+
+    @staticmethod
+    def _guard(literal: str, literals: List[str]) -> str:
+        """Shortest other literal inside ``literal``, else a word it shares with another, else itself."""
+        contained = [other for other in literals if other != literal and other in literal]
+        if contained:
+            return min(contained, key=len)
+        word = max(literal.split(), key=lambda word: sum(word in other.split() for other in literals))
+        return word if sum(word in other.split() for other in literals) > 1 else literal
+
+    def match(self, text: str, offset: int = 0) -> Tuple[List[str], Dict[str, int], bool]:
+        """Return detected capabilities (in indicator order), where each was detected, and multi-step.
+
+        Like the substring scan this replaced, a capability's remaining keywords are
+        skipped once one of them matched; its offset is where that keyword first occurs.
+        """
+        text = text.lower()
+        positions: Dict[Optional[str], int] = {}
+        for guard, keywords in self.guards:
+            if guard not in text:
+                continue
+            for literal, search, capability in keywords:
+                if capability in positions or literal != guard and literal not in text:
+                    continue
+                found = search(text)
+                if found is not None:
+                    positions[capability] = found.start() + offset
+        requires_multi_step = positions.pop(None, None) is not None
+        capabilities = [capability for capability in self.capability_order if capability in positions]
+        return capabilities, positions, requires_multi_step
+
+COMPLEXITY_MATCHER = KeywordMatcher(COMPLEXITY_INDICATORS, MULTI_STEP_INDICATORS)
+
+class CircuitOpenError(Exception):
+    """Raised when every N8N endpoint's circuit breaker is open."""
+
+class N8NStatusError(Exception):
+    """Raised when the N8N webhook answers with a non-200 status."""
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with latency tracking for one N8N endpoint.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and requests
+    fail fast for ``cooldown`` seconds; the next request is then let through as a
+    half-open probe that either closes the breaker or re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.latency_ewma: Optional[float] = None
+        self.successes = 0
+        self.failures = 0
+        self.rejections = 0
+
+    def allow_request(self) -> bool:
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.cooldown:
+                self.rejections += 1
+                return False
+            self.state = "half_open"
+        return True
+
+    def record_success(self, latency: float):
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.successes += 1
+        self.latency_ewma = latency if self.latency_ewma is None else 0.2 * latency + 0.8 * self.latency_ewma
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self.failures += 1
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def retry_after(self) -> float:
+        return max(0.0, self.cooldown - (time.monotonic() - self.opened_at)) if self.state == "open" else 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "latency_ewma_ms": None if self.latency_ewma is None else round(self.latency_ewma * 1000, 1),
+            "successes": self.successes,
+            "failures": self.failures,
+            "rejections": self.rejections,
+            "retry_after": round(self.retry_after(), 1)
+        }
+
+CACHE_SIDE_EFFECT_CAPABILITIES = {"github_operations", "workflow_creation"}
+
+class ResponseCache:
+    """LRU response cache with a TTL, an entry cap and a byte budget."""
+
+    def __init__(self, ttl: float = 3600, max_entries: int = 256, max_bytes: int = 8388608):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._bytes = 0
+        self.counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expirations": 0, "bypasses": 0}
+
+    def configure(self, ttl: float, max_entries: int, max_bytes: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._shrink()
+
+    def _remove(self, key: str):
+        _, response = self._entries.pop(key)
+        self._bytes -= len(response.encode())
+
+    def _shrink(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            self._remove(next(iter(self._entries)))
+            self.counters["evictions"] += 1
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] < time.monotonic():
+            self._remove(key)
+            self.counters["expirations"] += 1
+            entry = None
+        if entry is None:
+            self.counters["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.counters["hits"] += 1
+        return entry[1]
+
+    def put(self, key: str, response: str):
+        size = len(response.encode())
+        if not response or size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl, response)
+        self._bytes += size
+        self.counters["stores"] += 1
+        self._shrink()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hit_rate": round(self.counters["hits"] / lookups, 3) if lookups else 0.0,
+            **self.counters
+        }
+
+class AdmissionRejectedError(Exception):
+    """Raised when a request cannot be queued for, or waited too long for, an N8N slot."""
+
+class FairAdmissionController:
+    """Global limit on concurrent N8N calls with round-robin queues per user.
+
+    When every slot is taken, requests wait in their user's FIFO queue and freed
+    slots go to users in turn, so one user's burst cannot starve the others.
+    Beyond ``max_queue_depth`` waiting requests, new ones are rejected at once.
+    """
+
+    def __init__(self, max_concurrent: int = 8, max_queue_depth: int = 50):
+        self.max_concurrent = max_concurrent
+        self.max_queue_depth = max_queue_depth
+        self.active = 0
+        self._queues: "OrderedDict[str, deque]" = OrderedDict()
+        self.counters = {"admitted": 0, "queued": 0, "rejected": 0, "timeouts": 0}
+
+    def configure(self, max_concurrent: int, max_queue_depth: int):
+        self.max_concurrent = max_concurrent
+        self.max_queue_depth = max_queue_depth
+        self._grant_waiting()
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def try_acquire(self, user_id: str) -> Optional[asyncio.Future]:
+        """Take a slot now (returns None) or join the user's queue (returns the future to await)."""
+        if self.active < self.max_concurrent and not self._queues:
+            self.active += 1
+            self.counters["admitted"] += 1
+            return None
+        if self.waiting >= self.max_queue_depth:
+            self.counters["rejected"] += 1
+            raise AdmissionRejectedError(
+                f"Jaguar is at capacity with {self.waiting} requests already waiting; please try again shortly"
+            )
+        ticket = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(user_id, deque()).append(ticket)
+        self.counters["queued"] += 1
+        return ticket
+
+    def position(self, user_id: str, ticket: asyncio.Future) -> int:
+        """1-based place of ``ticket`` in the round-robin grant order."""
+        queue = self._queues.get(user_id)
+        if not queue or ticket not in queue:
+            return 0
+        rank = queue.index(ticket)
+        ahead = rank
+        turn_before = True
+        for other_user, other_queue in self._queues.items():
+            if other_user == user_id:
+                turn_before = False
+                continue
+            ahead += min(len(other_queue), rank + 1 if turn_before else rank)
+        return ahead + 1
+
+    def release(self):
+        self.active -= 1
+        self._grant_waiting()
+
+    def abandon(self, user_id: str, ticket: asyncio.Future):
+        """Give up a queued ticket, returning its slot if it was granted meanwhile."""
+        if ticket.done() and not ticket.cancelled():
+            self.release()
+            return
+        ticket.cancel()
+        queue = self._queues.get(user_id)
+        if queue and ticket in queue:
+            queue.remove(ticket)
+            if not queue:
+                del self._queues[user_id]
+
+    def _grant_waiting(self):
+        while self.active < self.max_concurrent and self._queues:
+            # The user served moves to the back of the rotation
+            user_id, queue = self._queues.popitem(last=False)
+            ticket = queue.popleft()
+            if queue:
+                self._queues[user_id] = queue
+            if ticket.done():
+                continue
+            ticket.set_result(None)
+            self.active += 1
+            self.counters["admitted"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "waiting_users": len(self._queues),
+            **self.counters
+        }
+
+class StreamHandoff:
+    """Resources a streamed reply holds until it has been relayed: the open response plus
+    a release callback (admission slot, waiting duplicates).
+
+    A returned generator that is never iterated never runs its ``finally``, e.g. when
+    the client disconnects before OpenWebUI starts streaming, so the handoff is also
+    released when the generator is garbage collected unstarted or has not been
+    started within ``start_timeout`` seconds.
+    """
+
+    def __init__(
+        self,
+        response: httpx.Response,
+        on_release: Optional[Callable[[Optional[str], Optional[BaseException]], None]] = None
+    ):
+        self.response = response
+        self._on_release = on_release
+        self._loop = asyncio.get_running_loop()
+        self._reaper: Optional[asyncio.TimerHandle] = None
+        self.claimed = False
+        self.released = False
+
+    def watch(self, generator: AsyncGenerator[str, None], start_timeout: float) -> AsyncGenerator[str, None]:
+        weakref.finalize(generator, self._abandon_soon)
+        self._reaper = self._loop.call_later(max(0.0, start_timeout), self._abandon)
+        return generator
+
+    def claim(self) -> bool:
+        """Mark the reply as being relayed; False if it was already given up on."""
+        if self.released:
+            return False
+        self.claimed = True
+        if self._reaper is not None:
+            self._reaper.cancel()
+        return True
+
+    def release(self, result: Optional[str] = None, error: Optional[BaseException] = None):
+        if self.released:
+            return
+        self.released = True
+        if self._reaper is not None:
+            self._reaper.cancel()
+        if self._on_release is not None:
+            self._on_release(result, error)
+
+    def _abandon(self):
+        if self.claimed or self.released:
+            return
+        self.release(error=Exception("The streamed reply was abandoned before it was read"))
+        if not self.response.is_closed:
+            self._loop.create_task(self.response.aclose())
+
+    def _abandon_soon(self):
+        # Garbage collection may run this outside the event loop's thread
+        if not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._abandon)
+
+class BackgroundWorkQueue:
+    """Bounded FIFO of post-response jobs run one at a time by a background task.
+
+    Jobs are keyed (by chat) so a request can wait for its own chat's pending
+    jobs. When ``max_size`` jobs are already waiting, new ones are dropped and
+    counted instead of slowing down the response path.
+    """
+
+    def __init__(self, max_size: int = 1000):
+        self.max_size = max_size
+        self._jobs: deque = deque()
+        self._pending: Dict[str, int] = {}
+        self._waiters: Dict[str, List[asyncio.Future]] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.counters = {"submitted": 0, "completed": 0, "failed": 0, "dropped": 0}
+
+    def configure(self, max_size: int):
+        self.max_size = max_size
+
+    def submit(self, key: str, job: Callable[[], Awaitable[None]]) -> bool:
+        """Queue ``job`` for background execution; False if it was dropped."""
+        if len(self._jobs) >= self.max_size:
+            self.counters["dropped"] += 1
+            return False
+        self._ensure_worker()
+        self._jobs.append((key, job))
+        self._pending[key] = self._pending.get(key, 0) + 1
+        self.counters["submitted"] += 1
+        self._wakeup.set()
+        return True
+
+    async def wait_for(self, key: str):
+        """Wait until every job queued for ``key`` has run."""
+        if not self._pending.get(key):
+            return
+        self._ensure_worker()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(key, []).append(waiter)
+        await waiter
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._worker.get_loop() is not loop:
+            self._wakeup = asyncio.Event()
+            self._worker = loop.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            if not self._jobs:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            key, job = self._jobs.popleft()
+            try:
+                await job()
+                self.counters["completed"] += 1
+            except Exception:
+                self.counters["failed"] += 1
+            finally:
+                self._pending[key] -= 1
+                if not self._pending[key]:
+                    del self._pending[key]
+                    for waiter in self._waiters.pop(key, []):
+                        if not waiter.done():
+                            waiter.set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"depth": len(self._jobs), "max_size": self.max_size, **self.counters}
+
+    def to_prometheus(self) -> str:
+        lines = [
+            "# HELP jaguar_pipe_background_queue_depth Post-response jobs waiting to run.",
+            "# TYPE jaguar_pipe_background_queue_depth gauge",
+            f"jaguar_pipe_background_queue_depth {len(self._jobs)}",
+            "# HELP jaguar_pipe_background_jobs_total Post-response jobs by result.",
+            "# TYPE jaguar_pipe_background_jobs_total counter",
+        ]
+        lines += [f'jaguar_pipe_background_jobs_total{{result="{name}"}} {count}' for name, count in self.counters.items()]
+        return "\n".join(lines) + "\n"
+
+class WorkflowCatalog:
+    """Cached listing of the workflows in the N8N instance, refreshed in the background.
+
+    Pages through ``GET /workflows`` with the API's cursor, revalidating each page
+    with ``If-None-Match`` when the server sent an ETag, and keeps serving the
+    last good listing while a refresh runs or after one fails. ``version`` is a
+    hash of the compact listing, so consumers can tell when it changed.
+    """
+
+    def __init__(self, ttl: float = 300, page_size: int = 250, max_entries: int = 200):
+        self.ttl = ttl
+        self.page_size = page_size
+        self.max_entries = max_entries
+        self.workflows: List[Dict[str, Any]] = []
+        self.version: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self._loaded_at: Optional[float] = None
+        self._next_refresh = 0.0
+        self._pages: Dict[Optional[str], Tuple[str, Dict[str, Any]]] = {}
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.counters = {"refreshes": 0, "failures": 0, "changes": 0, "pages_fetched": 0, "pages_not_modified": 0}
+
+    def configure(self, ttl: float, page_size: int, max_entries: int):
+        if ttl != self.ttl:
+            self._next_refresh = min(self._next_refresh, (self._loaded_at or 0.0) + ttl)
+        self.ttl = ttl
+        self.page_size = page_size
+        self.max_entries = max_entries
+
+    def ensure_fresh(self, client: httpx.AsyncClient, url: str, headers: Dict[str, str]) -> Optional[asyncio.Task]:
+        """Start a background refresh when the listing is stale; returns the refresh in progress, if any."""
+        if self._refresh_task is None or self._refresh_task.done():
+            if time.monotonic() < self._next_refresh:
+                return None
+            self._refresh_task = asyncio.create_task(self.refresh(client, url, headers))
+        return self._refresh_task
+
+    @staticmethod
+    def compact(workflow: Dict[str, Any]) -> Dict[str, Any]:
+        """The fields Jaguar needs to reuse or avoid duplicating a workflow; nodes are left out."""
+        return {
+            "id": workflow.get("id"),
+            "name": workflow.get("name"),
+            "active": bool(workflow.get("active")),
+            "tags": sorted(tag["name"] for tag in workflow.get("tags") or [] if isinstance(tag, dict) and tag.get("name")),
+            "updatedAt": workflow.get("updatedAt")
+        }
+
+    async def refresh(self, client: httpx.AsyncClient, url: str, headers: Dict[str, str]):
+        try:
+            workflows = []
+            pages = {}
+            cursor = None
+            seen_cursors = set()
+            while True:
+                cached = self._pages.get(cursor)
+                page_headers = dict(headers)
+                if cached:
+                    page_headers["If-None-Match"] = cached[0]
+                params = {"limit": self.page_size, "excludePinnedData": "true"}
+                if cursor:
+                    params["cursor"] = cursor
+                
+                response = await client.get(url, params=params, headers=page_headers)
+                if response.status_code == 304 and cached:
+                    page = cached[1]
+                    self.counters["pages_not_modified"] += 1
+                elif response.status_code == 200:
+                    page = response.json()
+                    self.counters["pages_fetched"] += 1
+                else:
+                    raise N8NStatusError(
+                        f"N8N API Error while listing workflows: {response.status_code} - {response.text}",
+                        response.status_code
+                    )
+                etag = response.headers.get("ETag") or (cached[0] if response.status_code == 304 else None)
+                if etag:
+                    pages[cursor] = (etag, page)
+                
+                workflows.extend(self.compact(workflow) for workflow in page.get("data", []))
+                cursor = page.get("nextCursor")
+                if not cursor or cursor in seen_cursors:
+                    break
+                seen_cursors.add(cursor)
+            
+            # Most recently changed first, so truncation keeps what Jaguar is likeliest to touch
+            workflows.sort(key=lambda workflow: (workflow["updatedAt"] or "", workflow["name"] or ""), reverse=True)
+            version = hashlib.sha256(encode_json(workflows)).hexdigest()[:16]
+            if version != self.version:
+                self.counters["changes"] += 1
+            self.workflows = workflows
+            self.version = version
+            self._pages = pages
+            self._loaded_at = time.monotonic()
+            self._next_refresh = self._loaded_at + self.ttl
+            self.last_error = None
+            self.counters["refreshes"] += 1
+        except Exception as e:
+            # Keep serving the last good listing and retry sooner than a full TTL
+            self.counters["failures"] += 1
+            self.last_error = str(e)
+            self._next_refresh = time.monotonic() + min(self.ttl, 60)
+
+    def to_payload(self, include_workflows: bool) -> Dict[str, Any]:
+        """Compact catalog for the workflow payload; without entries it is just a version reference."""
+        catalog = {
+            "version": self.version,
+            "count": len(self.workflows),
+            "ageSeconds": round(time.monotonic() - self._loaded_at) if self._loaded_at else None
+        }
+        if include_workflows:
+            catalog["workflows"] = self.workflows[:self.max_entries]
+            catalog["truncated"] = len(self.workflows) > self.max_entries
+        return catalog
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workflows": len(self.workflows),
+            "version": self.version,
+            "age": round(time.monotonic() - self._loaded_at, 1) if self._loaded_at else None,
+            "last_error": self.last_error,
+            **self.counters
+        }
+
+class RollingLatency:
+    """Most recent workflow latencies per key (capability) with percentile lookups."""
+
+    def __init__(self, window: int = 100):
+        self.window = window
+        self._samples: Dict[str, deque] = {}
+
+    def configure(self, window: int):
+        if window != self.window:
+            self.window = window
+            self._samples = {key: deque(samples, maxlen=window) for key, samples in self._samples.items()}
+
+    def observe(self, key: str, seconds: float):
+        samples = self._samples.get(key)
+        if samples is None:
+            samples = self._samples[key] = deque(maxlen=self.window)
+        samples.append(seconds)
+
+    def percentile(self, key: str, q: float, min_samples: int = 1) -> Optional[float]:
+        samples = self._samples.get(key)
+        if not samples or len(samples) < max(1, min_samples):
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            key: {
+                "samples": len(samples),
+                "p50": round(self.percentile(key, 0.5), 3),
+                "p95": round(self.percentile(key, 0.95), 3)
+            }
+            for key, samples in self._samples.items() if samples
+        }
+
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram in the Prometheus (cumulative ``le``) layout."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.sum += seconds
+        for index, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.bucket_counts[index] += 1
+                break
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        total = 0
+        rows = []
+        for bound, count in zip(self.buckets, self.bucket_counts):
+            total += count
+            rows.append((repr(bound), total))
+        rows.append(("+Inf", self.count))
+        return rows
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (None past the last bucket)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        total = 0
+        for bound, count in zip(self.buckets, self.bucket_counts):
+            total += count
+            if total >= rank:
+                return bound
+        return None
+
+class PipeMetrics:
+    """Per-stage latency histograms plus request and error counters for the pipe.
+
+    Stages are timed with ``measure``; everything can be rendered in the Prometheus
+    text exposition format or as a single structured (JSON) log record.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.stages: Dict[str, LatencyHistogram] = {}
+        self.requests: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+
+    def observe(self, stage: str, seconds: float):
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            histogram = self.stages[stage] = LatencyHistogram(self.buckets)
+        histogram.observe(seconds)
+
+    @contextlib.contextmanager
+    def measure(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def record_request(self, outcome: str):
+        self.requests[outcome] = self.requests.get(outcome, 0) + 1
+
+    def record_error(self, error: BaseException):
+        # Wrapped transport errors are counted by their underlying type
+        error_type = type(error.__cause__ or error).__name__
+        self.errors[error_type] = self.errors.get(error_type, 0) + 1
+
+    def to_prometheus(self) -> str:
+        lines = [
+            "# HELP jaguar_pipe_stage_duration_seconds Time spent in each stage of a Jaguar pipe request.",
+            "# TYPE jaguar_pipe_stage_duration_seconds histogram",
+        ]
+        for stage, histogram in sorted(self.stages.items()):
+            for bound, count in histogram.cumulative():
+                lines.append(f'jaguar_pipe_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+            lines.append(f'jaguar_pipe_stage_duration_seconds_sum{{stage="{stage}"}} {histogram.sum:.6f}')
+            lines.append(f'jaguar_pipe_stage_duration_seconds_count{{stage="{stage}"}} {histogram.count}')
+        lines += [
+            "# HELP jaguar_pipe_requests_total Jaguar pipe requests by outcome.",
+            "# TYPE jaguar_pipe_requests_total counter",
+        ]
+        lines += [f'jaguar_pipe_requests_total{{outcome="{outcome}"}} {count}' for outcome, count in sorted(self.requests.items())]
+        lines += [
+            "# HELP jaguar_pipe_errors_total Jaguar pipe errors by exception type.",
+            "# TYPE jaguar_pipe_errors_total counter",
+        ]
+        lines += [f'jaguar_pipe_errors_total{{type="{error_type}"}} {count}' for error_type, count in sorted(self.errors.items())]
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        def milliseconds(value: Optional[float]) -> Optional[float]:
+            return None if value is None else round(value * 1000, 3)
+
+        return {
+            "stages": {
+                stage: {
+                    "count": histogram.count,
+                    "mean_ms": milliseconds(histogram.sum / histogram.count) if histogram.count else None,
+                    "p50_ms": milliseconds(histogram.quantile(0.5)),
+                    "p95_ms": milliseconds(histogram.quantile(0.95)),
+                    "p99_ms": milliseconds(histogram.quantile(0.99))
+                }
+                for stage, histogram in sorted(self.stages.items())
+            },
+            "requests": dict(self.requests),
+            "errors": dict(self.errors)
+        }
+
 def extract_event_info(event_emitter) -> tuple[Optional[str], Optional[str]]:
     """Extract chat and message IDs from event emitter for session tracking."""
     if not event_emitter or not event_emitter.__closure__:
@@ -50,6 +1128,18 @@ class Pipe:
             default="",
             description="N8N API key for workflow CRUD operations"
         )
+        workflow_catalog_ttl: float = Field(
+            default=300.0,
+            description="Seconds before the cached workflow catalog is refreshed in the background, 0 to disable the catalog"
+        )
+        workflow_catalog_page_size: int = Field(
+            default=250,
+            description="Workflows requested per page when listing the catalog"
+        )
+        workflow_catalog_max_entries: int = Field(
+            default=200,
+            description="Most recently updated workflows included in the payload"
+        )
         
         # GitHub Integration
         github_token: str = Field(
@@ -66,6 +1156,205 @@ class Pipe:
         response_field: str = Field(default="output")
         timeout: int = Field(default=120, description="Request timeout in seconds")
         
+        # Adaptive Deadlines
+        adaptive_deadlines: bool = Field(
+            default=False,
+            description="Derive each request's deadline from its complexity and recently observed latencies instead of the flat timeout"
+        )
+        deadline_min: float = Field(
+            default=15.0, description="Shortest adaptive deadline in seconds (simple requests fail fast)"
+        )
+        deadline_max: float = Field(
+            default=300.0, description="Longest adaptive deadline in seconds"
+        )
+        deadline_headroom: float = Field(
+            default=1.5, description="Multiplier applied to the estimated or learned p95 duration"
+        )
+        deadline_min_samples: int = Field(
+            default=20, description="Observed calls a capability needs before its learned p95 is used"
+        )
+        deadline_window: int = Field(
+            default=200, description="Recent calls per capability kept for the rolling p95"
+        )
+        
+        # Local Fast Path
+        enable_fast_path: bool = Field(
+            default=False, description="Answer simple conversational turns directly from the local Ollama model instead of N8N"
+        )
+        fast_path_max_complexity: int = Field(
+            default=0, description="Highest complexity score answered by the fast path"
+        )
+        fast_path_max_chars: int = Field(
+            default=2000, description="Longer messages always go to N8N"
+        )
+        ollama_url: str = Field(
+            default="http://localhost:11434", description="Ollama base URL used by the fast path"
+        )
+        fast_path_model: str = Field(
+            default="llama3.1", description="Ollama model used by the fast path"
+        )
+        fast_path_system_prompt: str = Field(
+            default="You are Jaguar, the AI developer agent of The Spatial Network. Answer conversational questions briefly and helpfully.",
+            description="System prompt for fast-path answers"
+        )
+        fast_path_history_messages: int = Field(
+            default=10, description="Most recent chat messages sent to the local model for context (0 sends only the current message)"
+        )
+        fast_path_timeout: float = Field(
+            default=30.0,
+            description="Seconds to wait for the local model before falling back to N8N: until a streamed answer starts, or for the whole answer when not streaming"
+        )
+        
+        # Long-Running Executions
+        execution_mode: str = Field(
+            default="sync",
+            description="'sync' waits on the webhook; 'poll' starts the workflow and polls its execution through n8n_api_url; 'auto' polls when the estimated duration reaches poll_min_estimated_duration"
+        )
+        poll_min_estimated_duration: int = Field(
+            default=45, description="Estimated seconds from which 'auto' mode polls instead of waiting on the webhook"
+        )
+        poll_timeout: int = Field(
+            default=900, description="Total seconds a polled execution may run before the pipe gives up"
+        )
+        poll_interval_min: float = Field(
+            default=1.0, description="Seconds between execution polls while the workflow is making progress"
+        )
+        poll_interval_max: float = Field(
+            default=10.0, description="Longest wait between polls once the workflow stops reporting progress"
+        )
+        
+        # Failover and Retries
+        n8n_failover_urls: str = Field(
+            default="", description="Comma-separated backup webhook URLs tried in order after n8n_url"
+        )
+        max_retries: int = Field(
+            default=2, description="Retry rounds for failures where the workflow cannot have started"
+        )
+        retry_gateway_errors: bool = Field(
+            default=False,
+            description="Also retry webhook calls answered with 502/504, although the gateway may already have started the workflow"
+        )
+        retry_backoff_base: float = Field(
+            default=0.5, description="Base seconds for exponential, fully jittered retry backoff"
+        )
+        retry_backoff_max: float = Field(
+            default=8.0, description="Maximum seconds to wait between retry rounds"
+        )
+        circuit_failure_threshold: int = Field(
+            default=5, description="Consecutive failures before an endpoint's circuit breaker opens"
+        )
+        circuit_cooldown: float = Field(
+            default=30.0, description="Seconds an open circuit breaker fails fast before probing again"
+        )
+        
+        # Admission Control
+        max_concurrent_executions: int = Field(
+            default=0, description="Maximum N8N calls in flight across all users; further requests queue fairly per user (0 disables)"
+        )
+        max_queue_depth: int = Field(
+            default=50, description="Requests allowed to wait for a slot before new ones are rejected immediately"
+        )
+        admission_queue_timeout: float = Field(
+            default=120.0, description="Maximum seconds a request waits in the queue before it is rejected"
+        )
+        
+        # Connection Pool Configuration
+        connect_timeout: float = Field(
+            default=10.0, description="Timeout in seconds for establishing a connection to N8N"
+        )
+        read_timeout: float = Field(
+            default=120.0, description="Maximum seconds to wait between bytes received from N8N"
+        )
+        pool_max_connections: int = Field(
+            default=20, description="Maximum concurrent connections to N8N shared by all chats"
+        )
+        pool_max_keepalive: int = Field(
+            default=20,
+            description="Maximum idle keep-alive connections kept open to N8N; below pool_max_connections, connections beyond it are closed after each burst and reopened on the next"
+        )
+        pool_keepalive_expiry: float = Field(
+            default=30.0, description="Seconds an idle keep-alive connection is kept before closing"
+        )
+        
+        # Streaming Configuration
+        enable_streaming: bool = Field(
+            default=False, description="Relay text deltas as they arrive when N8N streams its reply"
+        )
+        stream_content_types: str = Field(
+            default="text/event-stream,application/x-ndjson,application/jsonl",
+            description="Comma-separated response content types treated as a token stream"
+        )
+        
+        # Request Analysis
+        complexity_scan_chars: int = Field(
+            default=0,
+            description="Scan only this many characters (head and tail) of a long message for capability keywords, e.g. 16384 to speed up pasted logs and files (0 scans everything)"
+        )
+        
+        # Payload Encoding
+        payload_mode: str = Field(
+            default="full",
+            description="'full' resends all learning data each request; 'delta' sends a session reference plus unacknowledged interactions"
+        )
+        
+        # Response Cache
+        enable_response_cache: bool = Field(
+            default=False, description="Reuse answers to repeated documentation questions"
+        )
+        response_cache_ttl: int = Field(
+            default=3600, description="Seconds a cached documentation answer stays valid"
+        )
+        response_cache_max_entries: int = Field(
+            default=256, description="Maximum cached answers"
+        )
+        response_cache_max_bytes: int = Field(
+            default=8388608, description="Byte budget for all cached answers"
+        )
+        
+        # Session Store Limits
+        max_sessions: int = Field(
+            default=1000, description="Maximum chats kept in memory; least recently used are evicted"
+        )
+        session_idle_ttl: int = Field(
+            default=86400, description="Seconds of inactivity after which a chat's state is evicted (0 disables)"
+        )
+        session_max_bytes: int = Field(
+            default=262144, description="Per-chat byte budget for session and learning state (0 disables)"
+        )
+        max_learning_interactions: int = Field(
+            default=50, description="Maximum interactions kept per chat for learning"
+        )
+        
+        # Persistence
+        persistence_path: str = Field(
+            default="",
+            description="SQLite file for durable session and learning state (empty keeps state in memory only)"
+        )
+        persistence_flush_interval: float = Field(
+            default=2.0, description="Seconds between batched background writes of changed state"
+        )
+        persistence_retention_days: int = Field(
+            default=30, description="Days a persisted chat is kept after its last update (0 keeps forever)"
+        )
+        
+        # Background Bookkeeping
+        background_queue_size: int = Field(
+            default=1000,
+            description="Post-response learning and session updates queued for the background worker; more are dropped (0 runs them inline)"
+        )
+        
+        # Metrics Export
+        metrics_textfile_path: str = Field(
+            default="",
+            description="File the Prometheus text metrics are written to, e.g. for node_exporter's textfile collector (empty disables)"
+        )
+        metrics_log_lines: bool = Field(
+            default=False, description="Print metrics snapshots as structured JSON log lines"
+        )
+        metrics_export_interval: float = Field(
+            default=15.0, description="Minimum seconds between metrics exports"
+        )
+        
         # Status and Monitoring
         emit_interval: float = Field(
             default=1.5, description="Interval in seconds between status emissions"
@@ -116,83 +1405,233 @@ class Pipe:
         self.id = "jaguar_agi_pipe"
         self.name = "Jaguar AGI Developer Agent"
         self.valves = self.Valves()
-        self.last_emit_time = 0
-        self.session_context = {}
-        self.learning_data = {}
+        self._status_state: Dict[str, Dict[str, Any]] = {}
+        self._session_store_path = self.valves.persistence_path
+        self.session_context = self.create_session_store("session_context")
+        self.learning_data = self.create_session_store("learning_data", trim=trim_oldest_interactions)
+        self._circuit_breakers: Dict[str, CircuitBreaker] = {}
+        self.response_cache = ResponseCache()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.coalesced_requests = 0
+        self.metrics = PipeMetrics()
+        self.admission = FairAdmissionController()
+        self.workflow_latency = RollingLatency()
+        self.bookkeeping = BackgroundWorkQueue()
+        self.workflow_catalog = WorkflowCatalog()
+        self._metrics_exported_at = 0.0
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._http_client_config: Optional[tuple] = None
+
+    def create_session_store(
+        self, name: str, trim: Optional[Callable[[Any], bool]] = None
+    ) -> SessionStore:
+        """Build the store backing one kind of per-chat state."""
+        limits = {
+            "max_sessions": self.valves.max_sessions,
+            "idle_ttl": self.valves.session_idle_ttl,
+            "max_bytes_per_session": self.valves.session_max_bytes,
+            "trim": trim
+        }
+        if self.valves.persistence_path:
+            return SQLiteSessionStore(
+                self.valves.persistence_path,
+                name,
+                flush_interval=self.valves.persistence_flush_interval,
+                retention=self.valves.persistence_retention_days * 86400,
+                **limits
+            )
+        return SessionStore(**limits)
+
+    def configure_session_stores(self):
+        """Apply the current session valves, which OpenWebUI may change at runtime."""
+        if self.valves.persistence_path != self._session_store_path:
+            # Valves are assigned after construction; switch backends, keeping live state
+            self._session_store_path = self.valves.persistence_path
+            previous_stores = (self.session_context, self.learning_data)
+            self.session_context = self.create_session_store("session_context")
+            self.learning_data = self.create_session_store("learning_data", trim=trim_oldest_interactions)
+            for previous, current in zip(previous_stores, (self.session_context, self.learning_data)):
+                for key, value in previous.items():
+                    current[key] = value
+                    current.commit(key)
+                previous.close()
+        
+        for store in (self.session_context, self.learning_data):
+            store.configure(
+                self.valves.max_sessions,
+                self.valves.session_idle_ttl,
+                self.valves.session_max_bytes
+            )
+
+    def get_session_store_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Eviction counters and sizes of the session stores, for monitoring."""
+        return {
+            "session_context": self.session_context.stats(),
+            "learning_data": self.learning_data.stats()
+        }
+
+    def get_http_client(self) -> httpx.AsyncClient:
+        """Return the shared keep-alive client, rebuilding it when pool valves change."""
+        config = (
+            self.valves.timeout,
+            self.valves.connect_timeout,
+            self.valves.read_timeout,
+            self.valves.pool_max_connections,
+            self.valves.pool_max_keepalive,
+            self.valves.pool_keepalive_expiry,
+        )
+        if (
+            self._http_client is None
+            or self._http_client.is_closed
+            or config != self._http_client_config
+        ):
+            previous_client = self._http_client
+            self._http_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(
+                    connect=self.valves.connect_timeout,
+                    read=self.valves.read_timeout,
+                    write=self.valves.connect_timeout,
+                    pool=self.valves.timeout,
+                ),
+                limits=httpx.Limits(
+                    max_connections=self.valves.pool_max_connections,
+                    max_keepalive_connections=self.valves.pool_max_keepalive,
+                    keepalive_expiry=self.valves.pool_keepalive_expiry,
+                ),
+            )
+            self._http_client_config = config
+            
+            # Let requests still running on the old pool finish before closing it
+            if previous_client is not None and not previous_client.is_closed:
+                asyncio.get_running_loop().call_later(
+                    self.valves.timeout,
+                    lambda: asyncio.ensure_future(previous_client.aclose())
+                )
+        return self._http_client
 
     async def emit_status(
         self,
         __event_emitter__: Callable[[dict], Awaitable[None]],
         level: str,
-        message: str,
-        done: bool,
-        progress: Optional[float] = None
-    ):
-        """Enhanced status emission with progress tracking."""
-        current_time = time.time()
-        if (
-            __event_emitter__
-            and self.valves.enable_status_indicator
-            and (
-                current_time - self.last_emit_time >= self.valves.emit_interval or done
-            )
-        ):
-            status_data = {
-                "type": "status",
-                "data": {
-                    "status": "complete" if done else "in_progress",
-                    "level": level,
-                    "description": message,
-                    "done": done,
-                    "timestamp": datetime.now(timezone.utc).isoformat()
-                },
-            }
-            
-            if progress is not None:
-                status_data["data"]["progress"] = progress
-                
-            await __event_emitter__(status_data)
-            self.last_emit_time = current_time
+        message: str,
+        done: bool,
+        progress: Optional[float] = None,
+        metrics: Optional[Dict[str, Any]] = None
+    ):
+        """Enhanced status emission with progress tracking.
 
-    def analyze_request_complexity(self, message: str) -> Dict[str, Any]:
-        """Analyze request complexity and determine required capabilities."""
-        complexity_indicators = {
-            "workflow_creation": ["create workflow", "build workflow", "new workflow", "workflow for"],
-            "github_operations": ["github", "repository", "repo", "commit", "pull request", "issue"],
-            "code_generation": ["write code", "create function", "implement", "develop"],
-            "documentation": ["document", "explain", "how to", "tutorial", "guide"],
-            "debugging": ["debug", "fix", "error", "problem", "issue", "troubleshoot"],
-            "optimization": ["optimize", "improve", "enhance", "better", "performance"],
-            "learning": ["learn", "understand", "analyze", "study", "research"]
+        Throttling is tracked per chat: updates arriving within ``emit_interval`` of the
+        previous one are coalesced so only the latest is delivered when the window ends,
+        while done and error statuses are always sent immediately.
+        """
+        if not __event_emitter__ or not self.valves.enable_status_indicator:
+            return
+        
+        status_data = {
+            "type": "status",
+            "data": {
+                "status": "complete" if done else "in_progress",
+                "level": level,
+                "description": message,
+                "done": done,
+                "timestamp": datetime.now(timezone.utc).isoformat()
+            },
         }
         
-        detected_capabilities = []
-        complexity_score = 0
+        if progress is not None:
+            status_data["data"]["progress"] = progress
+        if metrics:
+            status_data["data"]["metrics"] = metrics
         
-        message_lower = message.lower()
+        chat_id, _ = extract_event_info(__event_emitter__)
+        key = chat_id or str(id(__event_emitter__))
+        state = self._status_state.get(key)
+        if state is None:
+            self.prune_status_state()
+            state = self._status_state[key] = {"last_emit": 0.0, "pending": None, "flush": None}
+        
+        elapsed = time.monotonic() - state["last_emit"]
+        if done or level == "error" or elapsed >= self.valves.emit_interval:
+            if state["flush"] is not None:
+                state["flush"].cancel()
+            state["pending"] = state["flush"] = None
+            state["last_emit"] = time.monotonic()
+            if done:
+                self._status_state.pop(key, None)
+            await __event_emitter__(status_data)
+            return
         
-        for capability, keywords in complexity_indicators.items():
-            if any(keyword in message_lower for keyword in keywords):
-                detected_capabilities.append(capability)
-                complexity_score += 1
+        # Inside the window: keep only the latest update and deliver it when the window ends
+        state["pending"] = (__event_emitter__, status_data)
+        if state["flush"] is None:
+            state["flush"] = asyncio.ensure_future(
+                self.flush_pending_status(key, self.valves.emit_interval - elapsed)
+            )
+
+    async def flush_pending_status(self, key: str, delay: float):
+        """Deliver the status coalesced for one chat once its throttle window ends."""
+        await asyncio.sleep(delay)
+        state = self._status_state.get(key)
+        if not state or state["pending"] is None:
+            return
+        __event_emitter__, status_data = state["pending"]
+        state["pending"] = state["flush"] = None
+        state["last_emit"] = time.monotonic()
+        await __event_emitter__(status_data)
+
+    def prune_status_state(self, max_chats: int = 1024, idle_seconds: float = 600):
+        """Forget throttle state of chats that went quiet without a final status."""
+        if len(self._status_state) < max_chats:
+            return
+        cutoff = time.monotonic() - idle_seconds
+        for key, state in list(self._status_state.items()):
+            if state["pending"] is None and state["last_emit"] < cutoff:
+                del self._status_state[key]
+
+    def analyze_request_complexity(self, message: str) -> Dict[str, Any]:
+        """Analyze request complexity and determine required capabilities.
+
+        Very long messages (pasted logs or source files) are scanned only in a head
+        and tail window of ``complexity_scan_chars``, where the actual request is.
+        """
+        scan_limit = self.valves.complexity_scan_chars
+        if 0 < scan_limit < len(message):
+            head_chars = scan_limit * 3 // 4
+            tail_start = len(message) - (scan_limit - head_chars)
+            head = COMPLEXITY_MATCHER.match(message[:head_chars])
+            tail = COMPLEXITY_MATCHER.match(message[tail_start:], offset=tail_start)
+            keyword_positions = {**tail[1], **head[1]}
+            detected_capabilities = [
+                capability for capability in COMPLEXITY_MATCHER.capability_order
+                if capability in keyword_positions
+            ]
+            requires_multi_step = head[2] or tail[2]
+        else:
+            detected_capabilities, keyword_positions, requires_multi_step = COMPLEXITY_MATCHER.match(message)
         
-        # Determine if multi-step processing is needed
-        multi_step_indicators = ["and then", "after that", "next", "also", "additionally"]
-        requires_multi_step = any(indicator in message_lower for indicator in multi_step_indicators)
+        complexity_score = len(detected_capabilities)
         
         return {
             "capabilities": detected_capabilities,
             "complexity_score": complexity_score,
             "requires_multi_step": requires_multi_step,
+            "keyword_positions": keyword_positions,
             "estimated_duration": min(complexity_score * 15, 120)  # seconds
         }
 
     async def execute_n8n_workflow(
         self,
         payload: Dict[str, Any],
-        __event_emitter__: Callable[[dict], Awaitable[None]]
-    ) -> Dict[str, Any]:
-        """Execute the main N8N workflow with enhanced error handling."""
+        __event_emitter__: Callable[[dict], Awaitable[None]],
+        stream: bool = False,
+        timeout: Optional[float] = None
+    ) -> Union[Dict[str, Any], httpx.Response]:
+        """Execute the main N8N workflow with enhanced error handling.
+
+        With ``stream`` set, a streaming (SSE/NDJSON) reply is returned as the open
+        response for the caller to consume; buffered JSON replies are parsed as usual.
+        ``timeout`` overrides the flat ``timeout`` valve for this call.
+        """
         headers = {
             "Content-Type": "application/json",
             "User-Agent": "Jaguar-AGI-Agent/2.0"
@@ -200,21 +1639,36 @@ class Pipe:
         
         if self.valves.n8n_bearer_token:
             headers["Authorization"] = f"Bearer {self.valves.n8n_bearer_token}"
+        if stream:
+            headers["Accept"] = "text/event-stream, application/x-ndjson, application/json"
+        
+        deadline = time.monotonic() + (timeout or self.valves.timeout)
         
         try:
             await self.emit_status(
                 __event_emitter__, "info", "🔗 Connecting to Jaguar AGI workflow...", False, 0.1
             )
             
-            response = requests.post(
-                self.valves.n8n_url,
-                json=payload,
-                headers=headers,
-                timeout=self.valves.timeout
+            # Connect/read timeouts are enforced by the pool, the total by the deadline
+            response = await self.send_with_failover(
+                encode_json(payload), headers, stream, deadline, __event_emitter__
             )
             
+            if self.valves.enable_debug_logging:
+                await self.emit_status(
+                    __event_emitter__, "debug", f"N8N Endpoints: {json.dumps(self.get_endpoint_stats())}", False
+                )
+            
+            if stream:
+                if response.status_code == 200 and self.is_streaming_response(response):
+                    return response
+                try:
+                    await asyncio.wait_for(response.aread(), timeout=deadline - time.monotonic())
+                finally:
+                    await response.aclose()
+            
             if response.status_code == 200:
-                response_data = response.json()
+                response_data = self.parse_response_body(response.text)
                 
                 if self.valves.enable_debug_logging:
                     await self.emit_status(
@@ -225,16 +1679,547 @@ class Pipe:
             else:
                 error_msg = f"N8N API Error: {response.status_code} - {response.text}"
                 await self.emit_status(__event_emitter__, "error", error_msg, False)
-                raise Exception(error_msg)
+                raise N8NStatusError(error_msg, response.status_code)
                 
-        except requests.exceptions.Timeout:
+        except (asyncio.TimeoutError, httpx.TimeoutException) as e:
             error_msg = "N8N workflow execution timed out"
             await self.emit_status(__event_emitter__, "error", error_msg, False)
-            raise Exception(error_msg)
-        except requests.exceptions.ConnectionError:
+            raise Exception(error_msg) from e
+        except httpx.ConnectError as e:
             error_msg = "Failed to connect to N8N workflow"
             await self.emit_status(__event_emitter__, "error", error_msg, False)
-            raise Exception(error_msg)
+            raise Exception(error_msg) from e
+        except httpx.TransportError as e:
+            error_msg = f"Connection to N8N workflow was interrupted: {e}"
+            await self.emit_status(__event_emitter__, "error", error_msg, False)
+            raise Exception(error_msg) from e
+
+    def get_webhook_urls(self) -> List[str]:
+        """Primary webhook URL followed by the configured failover URLs, in order."""
+        urls = [self.valves.n8n_url] + [
+            url.strip() for url in self.valves.n8n_failover_urls.split(",") if url.strip()
+        ]
+        return list(dict.fromkeys(urls))
+
+    def get_circuit_breaker(self, url: str) -> CircuitBreaker:
+        breaker = self._circuit_breakers.get(url)
+        if breaker is None:
+            breaker = self._circuit_breakers[url] = CircuitBreaker()
+        breaker.failure_threshold = self.valves.circuit_failure_threshold
+        breaker.cooldown = self.valves.circuit_cooldown
+        return breaker
+
+    def get_endpoint_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Circuit breaker state and latency per configured webhook URL."""
+        return {url: self.get_circuit_breaker(url).snapshot() for url in self.get_webhook_urls()}
+
+    async def send_with_failover(
+        self,
+        content: bytes,
+        headers: Dict[str, str],
+        stream: bool,
+        deadline: float,
+        __event_emitter__: Callable[[dict], Awaitable[None]]
+    ) -> httpx.Response:
+        """POST to the first available webhook URL, retrying only where the workflow cannot have started.
+
+        Connection failures and 429/503 answers (502/504 too with ``retry_gateway_errors``)
+        move on to the next URL; once
+        every URL has been tried the next round waits a capped, fully jittered backoff,
+        unless every circuit breaker is open, in which case it gives up right away.
+        Timeouts after the request was sent are not retried.
+        """
+        client = self.get_http_client()
+        last_error: Optional[Exception] = None
+        last_response: Optional[httpx.Response] = None
+        
+        for attempt in range(self.valves.max_retries + 1):
+            if attempt:
+                # Sleeping is pointless while no breaker would let a request through
+                if all(self.get_circuit_breaker(url).retry_after() > 0 for url in self.get_webhook_urls()):
+                    break
+                backoff = random.uniform(
+                    0, min(self.valves.retry_backoff_max, self.valves.retry_backoff_base * 2 ** (attempt - 1))
+                )
+                if time.monotonic() + backoff >= deadline:
+                    break
+                await self.emit_status(
+                    __event_emitter__, "warning", f"🔁 Retrying Jaguar AGI workflow (attempt {attempt + 1})...", False
+                )
+                await asyncio.sleep(backoff)
+            
+            for url in self.get_webhook_urls():
+                breaker = self.get_circuit_breaker(url)
+                if not breaker.allow_request():
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                
+                started = time.monotonic()
+                # Lets the workflow budget its own steps against what is left of the deadline
+                attempt_headers = {**headers, "X-Jaguar-Deadline-Ms": str(int(remaining * 1000))}
+                # A buffered webhook sends nothing until it finishes, so the read timeout must
+                # cover the deadline the workflow was just promised
+                attempt_timeout = httpx.Timeout(
+                    connect=self.valves.connect_timeout,
+                    read=max(self.valves.read_timeout, remaining),
+                    write=self.valves.connect_timeout,
+                    pool=self.valves.timeout,
+                )
+                try:
+                    request = client.build_request(
+                        "POST", url, content=content, headers=attempt_headers, timeout=attempt_timeout
+                    )
+                    response = await asyncio.wait_for(client.send(request, stream=stream), timeout=remaining)
+                except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+                    breaker.record_failure()
+                    last_error = e
+                    continue
+                except (asyncio.TimeoutError, httpx.TransportError):
+                    breaker.record_failure()
+                    raise
+                
+                if response.status_code in RETRYABLE_STATUS_CODES:
+                    breaker.record_failure()
+                    if response.status_code in GATEWAY_STATUS_CODES and not self.valves.retry_gateway_errors:
+                        return response
+                    if stream:
+                        await response.aread()
+                        await response.aclose()
+                    last_response = response
+                    continue
+                
+                breaker.record_success(time.monotonic() - started)
+                return response
+        
+        if last_response is not None:
+            return last_response
+        if last_error is not None:
+            raise last_error
+        retry_after = min(breaker.retry_after() for breaker in map(self.get_circuit_breaker, self.get_webhook_urls()))
+        raise CircuitOpenError(
+            f"All N8N endpoints are failing; circuit breaker open, retry in {retry_after:.0f}s"
+        )
+
+    def get_request_timeout(self, complexity_analysis: Dict[str, Any]) -> float:
+        """Total seconds allowed for this request's workflow call.
+
+        With ``adaptive_deadlines`` on, this is the larger of the complexity estimate and
+        the learned p95 of each detected capability, times ``deadline_headroom`` and
+        clamped to ``deadline_min``..``deadline_max``; otherwise the flat ``timeout``.
+        """
+        if not self.valves.adaptive_deadlines:
+            return float(self.valves.timeout)
+        self.workflow_latency.configure(self.valves.deadline_window)
+        learned = [
+            self.workflow_latency.percentile(capability, 0.95, self.valves.deadline_min_samples)
+            for capability in complexity_analysis["capabilities"] or ["general"]
+        ]
+        budget = max([complexity_analysis["estimated_duration"]] + [p95 for p95 in learned if p95 is not None])
+        return min(max(budget * self.valves.deadline_headroom, self.valves.deadline_min), self.valves.deadline_max)
+
+    def observe_workflow_latency(self, complexity_analysis: Dict[str, Any], seconds: float):
+        """Feed one workflow call's duration into the rolling latency of each capability it used."""
+        for capability in complexity_analysis["capabilities"] or ["general"]:
+            self.workflow_latency.observe(capability, seconds)
+
+    def should_poll_execution(self, complexity_analysis: Dict[str, Any], stream: bool) -> bool:
+        """Decide whether this request starts the workflow and polls instead of waiting on the webhook."""
+        mode = self.valves.execution_mode
+        if stream or mode == "sync":
+            return False
+        return mode == "poll" or complexity_analysis["estimated_duration"] >= self.valves.poll_min_estimated_duration
+
+    async def execute_and_poll(
+        self,
+        payload: Dict[str, Any],
+        complexity_analysis: Dict[str, Any],
+        __event_emitter__: Callable[[dict], Awaitable[None]]
+    ) -> Dict[str, Any]:
+        """Start the workflow asynchronously, then poll its execution until it finishes.
+
+        The workflow is expected to answer the webhook right away with an
+        ``executionId``; if it answers with a finished result instead, that result is
+        used as-is. Polling backs off from ``poll_interval_min`` to ``poll_interval_max``
+        while no new nodes complete and runs until ``poll_timeout`` overall.
+        """
+        started = time.monotonic()
+        deadline = started + self.valves.poll_timeout
+        start_response = await self.execute_n8n_workflow({**payload, "executionMode": "async"}, __event_emitter__)
+        execution_id = start_response.get("executionId") or start_response.get("execution_id")
+        if not execution_id:
+            return start_response
+        
+        headers = {"Accept": "application/json"}
+        if self.valves.n8n_api_key:
+            headers["X-N8N-API-KEY"] = self.valves.n8n_api_key
+        url = f"{self.valves.n8n_api_url.rstrip('/')}/executions/{execution_id}"
+        client = self.get_http_client()
+        estimated_duration = max(complexity_analysis["estimated_duration"], 1)
+        interval = self.valves.poll_interval_min
+        nodes_done = 0
+        
+        await self.emit_status(
+            __event_emitter__, "info", f"🛰️ Workflow execution {execution_id} started; tracking progress...", False, 0.35
+        )
+        
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise Exception(
+                    f"N8N workflow execution {execution_id} did not finish within {self.valves.poll_timeout}s"
+                ) from asyncio.TimeoutError()
+            await asyncio.sleep(min(interval, remaining))
+            
+            try:
+                response = await asyncio.wait_for(
+                    client.get(url, params={"includeData": "true"}, headers=headers),
+                    timeout=max(0.1, min(self.valves.read_timeout, deadline - time.monotonic()))
+                )
+            except (asyncio.TimeoutError, httpx.TransportError):
+                # A slow or unreachable API does not mean the execution failed
+                interval = min(interval * 2, self.valves.poll_interval_max)
+                continue
+            
+            if response.status_code == 404 or response.status_code in RETRYABLE_STATUS_CODES:
+                # Not persisted yet, or the API is briefly unavailable
+                interval = min(interval * 2, self.valves.poll_interval_max)
+                continue
+            if response.status_code != 200:
+                raise N8NStatusError(
+                    f"N8N API Error while polling execution {execution_id}: {response.status_code} - {response.text}",
+                    response.status_code
+                )
+            
+            execution = response.json()
+            status = execution.get("status") or ("success" if execution.get("finished") else "running")
+            result_data = (execution.get("data") or {}).get("resultData") or {}
+            
+            if status in FAILED_EXECUTION_STATUSES:
+                error = result_data.get("error") or {}
+                raise Exception(
+                    f"N8N workflow execution {execution_id} {status}: {error.get('message', 'no error details')}"
+                )
+            if status == "success" or execution.get("finished"):
+                return self.extract_execution_output(execution_id, result_data)
+            
+            run_data = result_data.get("runData") or {}
+            if len(run_data) > nodes_done:
+                nodes_done = len(run_data)
+                interval = self.valves.poll_interval_min
+                elapsed = time.monotonic() - started
+                await self.emit_status(
+                    __event_emitter__,
+                    "info",
+                    f"⚙️ {result_data.get('lastNodeExecuted', 'Workflow')} done ({nodes_done} nodes, {elapsed:.0f}s)",
+                    False,
+                    0.35 + 0.45 * min(elapsed / estimated_duration, 1.0),
+                    metrics={"execution_id": execution_id, "nodes_done": nodes_done}
+                )
+            else:
+                interval = min(interval * 1.5, self.valves.poll_interval_max)
+
+    def extract_execution_output(self, execution_id: str, result_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Return the JSON of the first item the last executed node produced."""
+        runs = (result_data.get("runData") or {}).get(result_data.get("lastNodeExecuted")) or []
+        try:
+            output = runs[-1]["data"]["main"][0][0]["json"]
+        except (KeyError, IndexError, TypeError):
+            output = None
+        if not isinstance(output, dict) or not output:
+            raise Exception(f"N8N workflow execution {execution_id} finished without output")
+        return output
+
+    def is_streaming_response(self, response: httpx.Response) -> bool:
+        """Check whether N8N answered with one of the configured streaming content types."""
+        content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+        streaming_types = {
+            value.strip().lower()
+            for value in self.valves.stream_content_types.split(",")
+            if value.strip()
+        }
+        return content_type in streaming_types
+
+    def parse_response_body(self, text: str) -> Dict[str, Any]:
+        """Parse a buffered N8N reply, joining NDJSON items if the workflow streamed anyway."""
+        try:
+            response_data = json.loads(text)
+        except ValueError:
+            deltas = [self.parse_stream_line(line) for line in text.splitlines()]
+            return {self.valves.response_field: "".join(deltas)}
+        
+        # "Respond to Webhook" nodes answering with all items return a list
+        if isinstance(response_data, list):
+            response_data = response_data[0] if response_data else {}
+        if not isinstance(response_data, dict):
+            response_data = {self.valves.response_field: str(response_data)}
+        return response_data
+
+    def parse_stream_line(self, line: str) -> str:
+        """Extract the text delta from one SSE or NDJSON line of a streaming N8N reply."""
+        line = line.strip()
+        if not line or line.startswith(":") or line.startswith(("event:", "id:", "retry:")):
+            return ""
+        if line.startswith("data:"):
+            line = line[len("data:"):].strip()
+        if line == "[DONE]":
+            return ""
+        
+        try:
+            event = json.loads(line)
+        except ValueError:
+            return line
+        
+        if isinstance(event, str):
+            return event
+        if not isinstance(event, dict):
+            return ""
+        if event.get("type") == "error":
+            raise Exception(f"N8N workflow reported an error: {event.get('content', event)}")
+        if event.get("type") in ("begin", "end"):
+            return ""
+        
+        for key in ("content", self.valves.response_field, "text", "delta"):
+            if isinstance(event.get(key), str):
+                return event[key]
+        
+        # OpenAI-style chunks from workflows that proxy a chat model directly
+        choices = event.get("choices") or [{}]
+        return (choices[0].get("delta") or {}).get("content") or ""
+
+    async def iter_stream_deltas(
+        self, response: httpx.Response, deadline: float, parse_line: Callable[[str], str]
+    ) -> AsyncGenerator[str, None]:
+        """Yield the non-empty text deltas of a streamed reply, failing once ``deadline`` passes."""
+        lines = response.aiter_lines()
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            try:
+                line = await asyncio.wait_for(lines.__anext__(), timeout=remaining)
+            except StopAsyncIteration:
+                return
+            delta = parse_line(line)
+            if delta:
+                yield delta
+
+    async def stream_n8n_response(
+        self,
+        response: httpx.Response,
+        payload: Dict[str, Any],
+        session_id: str,
+        user_message: str,
+        complexity_analysis: Dict[str, Any],
+        started_at: float,
+        __event_emitter__: Callable[[dict], Awaitable[None]],
+        cache_key: Optional[str] = None,
+        handoff: Optional[StreamHandoff] = None,
+        request_timeout: Optional[float] = None
+    ) -> AsyncGenerator[str, None]:
+        """Relay text deltas from a streaming N8N reply, then record the full interaction."""
+        deadline = started_at + (request_timeout or self.valves.timeout)
+        relay_started = time.perf_counter()
+        chunks = []
+        time_to_first_token = None
+        jaguar_response = None
+        error_message = None
+        
+        try:
+            if handoff is not None and not handoff.claim():
+                raise Exception("The streamed reply was not read before its deadline")
+            async for delta in self.iter_stream_deltas(response, deadline, self.parse_stream_line):
+                if time_to_first_token is None:
+                    time_to_first_token = time.monotonic() - started_at
+                    await self.emit_status(
+                        __event_emitter__,
+                        "info",
+                        f"⚡ First token after {time_to_first_token:.2f}s",
+                        False,
+                        0.5,
+                        metrics={"time_to_first_token": round(time_to_first_token, 3)}
+                    )
+                
+                chunks.append(delta)
+                yield delta
+            jaguar_response = "".join(chunks)
+        except (asyncio.TimeoutError, httpx.TimeoutException) as e:
+            error_message = "N8N workflow stream timed out"
+            self.metrics.record_error(e)
+            self.observe_workflow_latency(complexity_analysis, time.monotonic() - started_at)
+        except httpx.TransportError as e:
+            error_message = f"Connection to N8N workflow was interrupted: {e}"
+            self.metrics.record_error(e)
+        except Exception as e:
+            error_message = str(e)
+            self.metrics.record_error(e)
+        finally:
+            await response.aclose()
+            self.metrics.observe("stream_relay", time.perf_counter() - relay_started)
+            # Waiting duplicates get the full text, or an error if the stream failed or was abandoned
+            if handoff is not None:
+                if jaguar_response is not None:
+                    handoff.release(result=jaguar_response)
+                else:
+                    handoff.release(error=Exception(error_message or "Streaming response was cancelled"))
+        
+        if error_message:
+            await self.emit_status(
+                __event_emitter__,
+                "error",
+                f"❌ Jaguar AGI encountered an error: {error_message}",
+                True
+            )
+            self.finish_request_metrics("error", started_at)
+            yield f"\n\n---\nI encountered an error while streaming the response: {error_message}"
+            return
+        
+        self.observe_workflow_latency(complexity_analysis, time.monotonic() - started_at)
+        if cache_key:
+            self.response_cache.put(cache_key, jaguar_response)
+        self.acknowledge_session_version(session_id, payload)
+        await self.schedule_interaction(session_id, user_message, jaguar_response, complexity_analysis)
+        self.finish_request_metrics("success", started_at, path="n8n")
+        
+        metrics = {"total_time": round(time.monotonic() - started_at, 3)}
+        if time_to_first_token is not None:
+            metrics["time_to_first_token"] = round(time_to_first_token, 3)
+        await self.emit_status(
+            __event_emitter__,
+            "success",
+            f"✅ Jaguar AGI has completed the task (first token after {metrics.get('time_to_first_token', metrics['total_time']):.2f}s)",
+            True,
+            1.0,
+            metrics=metrics
+        )
+        
+        if self.valves.enable_debug_logging:
+            yield self.format_debug_info(session_id, complexity_analysis)
+
+    def should_use_fast_path(self, user_message: str, complexity_analysis: Dict[str, Any]) -> bool:
+        """Simple, single-step conversational turns can skip the N8N workflow."""
+        return (
+            self.valves.enable_fast_path
+            and complexity_analysis["complexity_score"] <= self.valves.fast_path_max_complexity
+            and not complexity_analysis["requires_multi_step"]
+            and len(user_message) <= self.valves.fast_path_max_chars
+        )
+
+    async def start_fast_path(
+        self, messages: List[Dict[str, Any]], stream: bool
+    ) -> Union[str, httpx.Response]:
+        """Ask the local Ollama model directly; returns the answer, or the open response when streaming."""
+        # messages[-0:] would be the whole chat; the current message is always sent
+        recent = messages[-max(1, self.valves.fast_path_history_messages):]
+        history = [
+            {"role": message["role"], "content": message["content"]}
+            for message in recent
+            if message.get("role") in ("user", "assistant") and isinstance(message.get("content"), str)
+        ]
+        request_body = {
+            "model": self.valves.fast_path_model,
+            "messages": [{"role": "system", "content": self.valves.fast_path_system_prompt}] + history,
+            "stream": stream,
+            "options": {"temperature": self.valves.creativity_level}
+        }
+        client = self.get_http_client()
+        request = client.build_request(
+            "POST",
+            f"{self.valves.ollama_url.rstrip('/')}/api/chat",
+            content=encode_json(request_body),
+            headers={"Content-Type": "application/json"}
+        )
+        response = await asyncio.wait_for(
+            client.send(request, stream=stream), timeout=self.valves.fast_path_timeout
+        )
+        if response.status_code != 200:
+            if stream:
+                await response.aread()
+                await response.aclose()
+            raise Exception(f"Ollama API Error: {response.status_code} - {response.text}")
+        if stream:
+            return response
+        answer = (response.json().get("message") or {}).get("content", "")
+        if not answer:
+            raise Exception("Ollama returned an empty answer")
+        return answer
+
+    def parse_ollama_line(self, line: str) -> str:
+        """Extract the text delta from one NDJSON line of a streaming Ollama chat reply."""
+        if not line.strip():
+            return ""
+        event = json.loads(line)
+        if event.get("error"):
+            raise Exception(f"Ollama reported an error: {event['error']}")
+        return (event.get("message") or {}).get("content", "")
+
+    async def stream_fast_path_response(
+        self,
+        response: httpx.Response,
+        session_id: str,
+        user_message: str,
+        complexity_analysis: Dict[str, Any],
+        started_at: float,
+        __event_emitter__: Callable[[dict], Awaitable[None]],
+        handoff: Optional[StreamHandoff] = None
+    ) -> AsyncGenerator[str, None]:
+        """Relay the local model's streamed answer, then record it like any other interaction."""
+        chunks = []
+        time_to_first_token = None
+        error_message = None
+        
+        try:
+            if handoff is not None and not handoff.claim():
+                raise Exception("The streamed reply was not read before its deadline")
+            async for delta in self.iter_stream_deltas(
+                response, started_at + self.valves.timeout, self.parse_ollama_line
+            ):
+                if time_to_first_token is None:
+                    time_to_first_token = time.monotonic() - started_at
+                chunks.append(delta)
+                yield delta
+        except (asyncio.TimeoutError, httpx.TimeoutException) as e:
+            error_message = "Local model stream timed out"
+            self.metrics.record_error(e)
+        except httpx.TransportError as e:
+            error_message = f"Connection to the local model was interrupted: {e}"
+            self.metrics.record_error(e)
+        except Exception as e:
+            error_message = str(e)
+            self.metrics.record_error(e)
+        finally:
+            await response.aclose()
+            if handoff is not None:
+                handoff.release()
+        
+        if error_message:
+            await self.emit_status(
+                __event_emitter__,
+                "error",
+                f"❌ Jaguar AGI encountered an error: {error_message}",
+                True
+            )
+            self.finish_request_metrics("error", started_at)
+            yield f"\n\n---\nI encountered an error while streaming the response: {error_message}"
+            return
+        
+        await self.schedule_interaction(session_id, user_message, "".join(chunks), complexity_analysis)
+        self.finish_request_metrics("fast_path", started_at, path="fast_path")
+        metrics = {"path": "fast_path", "total_time": round(time.monotonic() - started_at, 3)}
+        if time_to_first_token is not None:
+            metrics["time_to_first_token"] = round(time_to_first_token, 3)
+        await self.emit_status(
+            __event_emitter__,
+            "success",
+            f"⚡ Jaguar answered locally in {metrics['total_time']:.2f}s",
+            True,
+            1.0,
+            metrics=metrics
+        )
+        
+        if self.valves.enable_debug_logging:
+            yield self.format_debug_info(session_id, complexity_analysis)
 
     async def handle_learning_and_adaptation(
         self,
@@ -252,10 +2237,16 @@ class Pipe:
             self.learning_data[chat_id] = {
                 "interactions": [],
                 "preferences": {},
-                "success_patterns": []
+                "success_patterns": [],
+                "version": 0,
+                "acked_version": 0
             }
         
+        learning_entry = self.learning_data[chat_id]
+        learning_entry["version"] = learning_entry.get("version", 0) + 1
+        
         interaction = {
+            "seq": learning_entry["version"],
             "timestamp": datetime.now(timezone.utc).isoformat(),
             "user_message": user_message,
             "response": response,
@@ -265,9 +2256,359 @@ class Pipe:
         
         self.learning_data[chat_id]["interactions"].append(interaction)
         
-        # Keep only last 50 interactions per session
-        if len(self.learning_data[chat_id]["interactions"]) > 50:
-            self.learning_data[chat_id]["interactions"] = self.learning_data[chat_id]["interactions"][-50:]
+        # Keep only the most recent interactions per session
+        max_interactions = self.valves.max_learning_interactions
+        if len(self.learning_data[chat_id]["interactions"]) > max_interactions:
+            del self.learning_data[chat_id]["interactions"][:-max_interactions]
+        
+        self.learning_data.commit(chat_id)
+
+    async def schedule_interaction(
+        self,
+        session_id: str,
+        user_message: str,
+        jaguar_response: str,
+        complexity_analysis: Dict[str, Any]
+    ):
+        """Hand the post-response bookkeeping to the background queue (or run it inline when disabled)."""
+        async def job():
+            with self.metrics.measure("learning"):
+                await self.record_interaction(session_id, user_message, jaguar_response, complexity_analysis, None)
+        
+        if self.valves.background_queue_size <= 0:
+            await job()
+            return
+        self.bookkeeping.configure(self.valves.background_queue_size)
+        self.bookkeeping.submit(session_id, job)
+
+    async def record_interaction(
+        self,
+        session_id: str,
+        user_message: str,
+        jaguar_response: str,
+        complexity_analysis: Dict[str, Any],
+        __event_emitter__: Callable[[dict], Awaitable[None]]
+    ):
+        """Update learning data and session context after a completed response."""
+        # Handle learning and adaptation
+        await self.handle_learning_and_adaptation(
+            session_id, user_message, jaguar_response, __event_emitter__
+        )
+        
+        # Update session context
+        if session_id not in self.session_context:
+            self.session_context[session_id] = {
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "message_count": 0,
+                "capabilities_used": []
+            }
+        
+        self.session_context[session_id]["message_count"] += 1
+        self.session_context[session_id]["last_activity"] = datetime.now(timezone.utc).isoformat()
+        # Kept as a sorted list so the context round-trips through JSON unchanged
+        self.session_context[session_id]["capabilities_used"] = sorted(
+            set(self.session_context[session_id]["capabilities_used"]) | set(complexity_analysis["capabilities"])
+        )
+        self.session_context.commit(session_id)
+
+    def build_payload(
+        self,
+        user_message: str,
+        session_id: str,
+        message_id: Optional[str],
+        __user__: Optional[dict],
+        complexity_analysis: Dict[str, Any],
+        stream: bool
+    ) -> Dict[str, Any]:
+        """Build the enhanced payload sent to the Jaguar N8N workflow."""
+        return {
+            self.valves.input_field: user_message,
+            "sessionId": session_id,
+            "messageId": message_id,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "userInfo": __user__ or {},
+            
+            # AGI Feature Flags
+            "enableRAG": self.valves.enable_rag,
+            "enableGitHub": self.valves.enable_github_operations,
+            "enableWorkflowGeneration": self.valves.enable_workflow_generation,
+            "enableSelfImprovement": self.valves.enable_self_improvement,
+            "enableCodeExecution": self.valves.enable_code_execution,
+            "enableDocumentationSync": self.valves.enable_documentation_sync,
+            "enableMultiAgentCoordination": self.valves.enable_multi_agent_coordination,
+            
+            # Complexity and Context
+            "complexityAnalysis": complexity_analysis,
+            "creativityLevel": self.valves.creativity_level,
+            "maxIterations": self.valves.max_iterations,
+            
+            # Session Context
+            **self.build_session_state(session_id),
+            **self.build_workflow_catalog(complexity_analysis),
+            
+            # Configuration
+            "githubOrg": self.valves.github_org,
+            "debugMode": self.valves.enable_debug_logging,
+            "streamResponse": stream
+        }
+
+    async def refresh_workflow_catalog(self, complexity_analysis: Dict[str, Any]):
+        """Keep the workflow catalog fresh in the background.
+
+        Only a workflow-creation request arriving before the first listing
+        waits for it, and no longer than ``read_timeout``.
+        """
+        if not (self.valves.enable_workflow_generation and self.valves.n8n_api_key and self.valves.workflow_catalog_ttl > 0):
+            return
+        self.workflow_catalog.configure(
+            self.valves.workflow_catalog_ttl,
+            self.valves.workflow_catalog_page_size,
+            self.valves.workflow_catalog_max_entries
+        )
+        refresh = self.workflow_catalog.ensure_fresh(
+            self.get_http_client(),
+            f"{self.valves.n8n_api_url.rstrip('/')}/workflows",
+            {"Accept": "application/json", "X-N8N-API-KEY": self.valves.n8n_api_key}
+        )
+        if (
+            refresh is not None
+            and self.workflow_catalog.version is None
+            and "workflow_creation" in complexity_analysis["capabilities"]
+        ):
+            await asyncio.wait({refresh}, timeout=self.valves.read_timeout)
+
+    def build_workflow_catalog(self, complexity_analysis: Dict[str, Any]) -> Dict[str, Any]:
+        """Workflow catalog for the payload: full entries for workflow creation, a version reference otherwise."""
+        if (
+            not self.valves.enable_workflow_generation
+            or self.valves.workflow_catalog_ttl <= 0
+            or self.workflow_catalog.version is None
+        ):
+            return {}
+        include_workflows = "workflow_creation" in complexity_analysis["capabilities"]
+        return {"workflowCatalog": self.workflow_catalog.to_payload(include_workflows)}
+
+    def build_session_state(self, session_id: str) -> Dict[str, Any]:
+        """Session context and learning history for the payload, in full or delta form."""
+        session_context = self.session_context.get(session_id, {})
+        learning_entry = self.learning_data.get(session_id, {})
+        
+        if self.valves.payload_mode != "delta":
+            return {"sessionContext": session_context, "learningData": learning_entry}
+        
+        interactions = learning_entry.get("interactions", [])
+        base_version = learning_entry.get("acked_version", 0)
+        
+        # Interactions trimmed before N8N acknowledged them leave a gap; resend everything kept
+        resync = bool(interactions) and interactions[0].get("seq", 0) > base_version + 1
+        if resync:
+            base_version = 0
+        
+        unacknowledged = []
+        for interaction in reversed(interactions):
+            if interaction.get("seq", 0) <= base_version:
+                break
+            unacknowledged.append(interaction)
+        unacknowledged.reverse()
+        
+        return {
+            "sessionRef": {
+                "sessionId": session_id,
+                "version": learning_entry.get("version", 0),
+                "baseVersion": base_version,
+                "resync": resync
+            },
+            "sessionContext": session_context,
+            "learningDelta": {
+                "interactions": unacknowledged,
+                "preferences": learning_entry.get("preferences", {}),
+                "success_patterns": learning_entry.get("success_patterns", [])
+            }
+        }
+
+    def acknowledge_session_version(
+        self,
+        session_id: str,
+        payload: Dict[str, Any],
+        response_data: Optional[Dict[str, Any]] = None
+    ):
+        """Mark the learning history sent in a delta payload as received by N8N.
+
+        The workflow may answer with ``sessionAck`` (the version it actually holds)
+        or ``resync: true`` to have the full retained history sent next time.
+        """
+        session_ref = payload.get("sessionRef")
+        learning_entry = self.learning_data.get(session_id)
+        if not session_ref or not learning_entry:
+            return
+        
+        response_data = response_data or {}
+        if response_data.get("resync"):
+            learning_entry["acked_version"] = 0
+        elif isinstance(response_data.get("sessionAck"), int):
+            learning_entry["acked_version"] = min(response_data["sessionAck"], learning_entry.get("version", 0))
+        else:
+            learning_entry["acked_version"] = max(learning_entry.get("acked_version", 0), session_ref["version"])
+
+    def get_response_cache_key(self, user_message: str, complexity_analysis: Dict[str, Any]) -> Optional[str]:
+        """Cache key for a documentation question, or None when the request must not be cached."""
+        if not self.valves.enable_response_cache:
+            return None
+        capabilities = set(complexity_analysis["capabilities"])
+        if "documentation" not in capabilities or capabilities & CACHE_SIDE_EFFECT_CAPABILITIES:
+            self.response_cache.counters["bypasses"] += 1
+            return None
+        
+        self.response_cache.configure(
+            self.valves.response_cache_ttl,
+            self.valves.response_cache_max_entries,
+            self.valves.response_cache_max_bytes
+        )
+        feature_flags = (
+            self.valves.enable_rag,
+            self.valves.enable_github_operations,
+            self.valves.enable_workflow_generation,
+            self.valves.enable_self_improvement,
+            self.valves.enable_code_execution,
+            self.valves.enable_documentation_sync,
+            self.valves.enable_multi_agent_coordination,
+            self.valves.creativity_level,
+            self.valves.n8n_url
+        )
+        normalized_message = " ".join(user_message.lower().split())
+        return hashlib.sha256(f"{normalized_message}\x00{feature_flags}".encode()).hexdigest()
+
+    async def wait_for_admission(
+        self, user_id: str, __event_emitter__: Callable[[dict], Awaitable[None]]
+    ) -> bool:
+        """Wait for a slot under ``max_concurrent_executions``, reporting queue position.
+
+        Returns True when a slot was taken; the caller must release it once the N8N
+        call (including any streamed or polled result) is finished.
+        """
+        if self.valves.max_concurrent_executions <= 0:
+            return False
+        self.admission.configure(self.valves.max_concurrent_executions, self.valves.max_queue_depth)
+        ticket = self.admission.try_acquire(user_id)
+        if ticket is None:
+            return True
+        
+        started = time.monotonic()
+        deadline = started + self.valves.admission_queue_timeout
+        try:
+            while not ticket.done():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.admission.counters["timeouts"] += 1
+                    raise AdmissionRejectedError(
+                        f"Jaguar stayed at capacity for {self.valves.admission_queue_timeout:.0f}s; please try again shortly"
+                    )
+                position = self.admission.position(user_id, ticket)
+                waited = time.monotonic() - started
+                await self.emit_status(
+                    __event_emitter__,
+                    "info",
+                    f"⏳ Waiting for a free Jaguar worker: position {position} in queue ({waited:.0f}s)",
+                    False,
+                    0.25,
+                    metrics={"queue_position": position, "queue_wait": round(waited, 2)}
+                )
+                await asyncio.wait([ticket], timeout=min(remaining, max(1.0, self.valves.emit_interval)))
+        except BaseException:
+            self.admission.abandon(user_id, ticket)
+            raise
+        
+        self.metrics.observe("admission_wait", time.monotonic() - started)
+        return True
+
+    def get_flight_key(self, session_id: str, user_message: str) -> str:
+        """Identity of a request for single-flight coalescing: same chat, same message."""
+        return hashlib.sha256(f"{session_id}\x00{user_message.strip()}".encode()).hexdigest()
+
+    def start_flight(self, flight_key: str, timeout: float) -> Tuple[str, asyncio.Future]:
+        """Register a request as in flight so identical duplicates can wait on it.
+
+        The flight fails on its own after ``timeout`` seconds, so duplicates are never left
+        waiting on a request whose result is never delivered.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        flight = (flight_key, future)
+        expiry = loop.call_later(
+            timeout,
+            lambda: self.finish_flight(
+                flight, error=Exception(f"The identical request did not finish within {timeout:.0f}s")
+            )
+        )
+        # Avoid "exception never retrieved" warnings when nobody was waiting
+        future.add_done_callback(lambda done: expiry.cancel() or done.cancelled() or done.exception())
+        self._inflight[flight_key] = future
+        return flight
+
+    def finish_flight(
+        self,
+        flight: Tuple[str, asyncio.Future],
+        result: Optional[str] = None,
+        error: Optional[BaseException] = None
+    ):
+        """Resolve an in-flight request for its waiting duplicates and forget it."""
+        flight_key, future = flight
+        if self._inflight.get(flight_key) is future:
+            del self._inflight[flight_key]
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def extract_response(self, response_data: Dict[str, Any]) -> str:
+        """Pull the assistant text out of a buffered N8N reply."""
+        jaguar_response = response_data.get(self.valves.response_field, "")
+        
+        if not jaguar_response:
+            # Fallback response extraction
+            jaguar_response = (
+                response_data.get("result", "") or
+                response_data.get("message", "") or
+                str(response_data)
+            )
+        return jaguar_response
+
+    def finish_request_metrics(self, outcome: str, started_at: float, path: Optional[str] = None):
+        """Count a finished request, record its total time (also per answering path) and export metrics if due."""
+        elapsed = time.monotonic() - started_at
+        self.metrics.record_request(outcome)
+        self.metrics.observe("total", elapsed)
+        if path:
+            self.metrics.observe(f"total_{path}", elapsed)
+        self.export_metrics()
+
+    def export_metrics(self, force: bool = False):
+        """Write the Prometheus textfile and/or a JSON log line, at most once per export interval."""
+        if not self.valves.metrics_textfile_path and not self.valves.metrics_log_lines:
+            return
+        now = time.monotonic()
+        if not force and now - self._metrics_exported_at < self.valves.metrics_export_interval:
+            return
+        self._metrics_exported_at = now
+        
+        if self.valves.metrics_log_lines:
+            print(json.dumps({"event": "jaguar_pipe_metrics", "timestamp": datetime.now(timezone.utc).isoformat(), **self.metrics.snapshot(), "background_queue": self.bookkeeping.stats()}), flush=True)
+        if self.valves.metrics_textfile_path:
+            # Write-then-rename so a scraper never reads a half-written file
+            path = self.valves.metrics_textfile_path
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            try:
+                with open(temp_path, "w", encoding="utf-8") as handle:
+                    handle.write(self.metrics.to_prometheus() + self.bookkeeping.to_prometheus())
+                os.replace(temp_path, path)
+            except OSError:
+                pass
+
+    def format_debug_info(self, session_id: str, complexity_analysis: Dict[str, Any]) -> str:
+        """Render the debug footer appended to responses when debug logging is on."""
+        return f"\n\n---\n**Debug Info:**\n- Session: {session_id}\n- Complexity: {complexity_analysis['complexity_score']}/7\n- Capabilities: {', '.join(complexity_analysis['capabilities'])}\n- Session Stores: {json.dumps(self.get_session_store_stats())}\n- N8N Endpoints: {json.dumps(self.get_endpoint_stats())}\n- Response Cache: {json.dumps(self.response_cache.stats())}\n- Coalesced Requests: {self.coalesced_requests}\n- Admission: {json.dumps(self.admission.stats())}\n- Workflow Latency: {json.dumps(self.workflow_latency.stats())}\n- Background Queue: {json.dumps(self.bookkeeping.stats())}\n- Workflow Catalog: {json.dumps(self.workflow_catalog.stats())}"
 
     async def pipe(
         self,
@@ -275,12 +2616,16 @@ class Pipe:
         __user__: Optional[dict] = None,
         __event_emitter__: Callable[[dict], Awaitable[None]] = None,
         __event_call__: Callable[[dict], Awaitable[dict]] = None,
-    ) -> Optional[dict]:
+    ) -> Union[dict, AsyncGenerator[str, None], None]:
         """Main pipe function with enhanced AGI capabilities."""
         
         # Initialize session tracking
         chat_id, message_id = extract_event_info(__event_emitter__)
         session_id = chat_id or f"session_{int(time.time())}"
+        started_at = time.monotonic()
+        self.configure_session_stores()
+        await self.session_context.ensure_loaded(session_id)
+        await self.learning_data.ensure_loaded(session_id)
         
         await self.emit_status(
             __event_emitter__, "info", "🐆 Jaguar AGI is awakening...", False, 0.05
@@ -304,7 +2649,8 @@ class Pipe:
         user_message = messages[-1]["content"]
         
         # Analyze request complexity
-        complexity_analysis = self.analyze_request_complexity(user_message)
+        with self.metrics.measure("analysis"):
+            complexity_analysis = self.analyze_request_complexity(user_message)
         
         await self.emit_status(
             __event_emitter__,
@@ -314,48 +2660,168 @@ class Pipe:
             0.15
         )
         
+        stream = self.valves.enable_streaming and bool(body.get("stream", False))
+        request_timeout = self.get_request_timeout(complexity_analysis)
+        round_trip_started = None
+        flight = None
+        admitted = False
+        streaming_handoff = False
+        
         try:
-            # Prepare enhanced payload
-            payload = {
-                self.valves.input_field: user_message,
-                "sessionId": session_id,
-                "messageId": message_id,
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "userInfo": __user__ or {},
-                
-                # AGI Feature Flags
-                "enableRAG": self.valves.enable_rag,
-                "enableGitHub": self.valves.enable_github_operations,
-                "enableWorkflowGeneration": self.valves.enable_workflow_generation,
-                "enableSelfImprovement": self.valves.enable_self_improvement,
-                "enableCodeExecution": self.valves.enable_code_execution,
-                "enableDocumentationSync": self.valves.enable_documentation_sync,
-                "enableMultiAgentCoordination": self.valves.enable_multi_agent_coordination,
-                
-                # Complexity and Context
-                "complexityAnalysis": complexity_analysis,
-                "creativityLevel": self.valves.creativity_level,
-                "maxIterations": self.valves.max_iterations,
-                
-                # Session Context
-                "sessionContext": self.session_context.get(session_id, {}),
-                "learningData": self.learning_data.get(session_id, {}),
-                
-                # Configuration
-                "githubOrg": self.valves.github_org,
-                "debugMode": self.valves.enable_debug_logging
-            }
+            # Serve repeated documentation questions from the response cache
+            cache_key = self.get_response_cache_key(user_message, complexity_analysis)
+            cached_response = self.response_cache.get(cache_key) if cache_key else None
+            if cached_response is not None:
+                await self.schedule_interaction(session_id, user_message, cached_response, complexity_analysis)
+                self.finish_request_metrics("cache_hit", started_at)
+                await self.emit_status(
+                    __event_emitter__,
+                    "success",
+                    "📚 Jaguar AGI answered from the documentation cache",
+                    True,
+                    1.0,
+                    metrics={"cache": "hit", "cache_hit_rate": self.response_cache.stats()["hit_rate"]}
+                )
+                if self.valves.enable_debug_logging:
+                    cached_response += self.format_debug_info(session_id, complexity_analysis)
+                body["messages"].append({
+                    "role": "assistant",
+                    "content": cached_response
+                })
+                return body
+            
+            # Answer simple conversational turns straight from the local model
+            if self.should_use_fast_path(user_message, complexity_analysis):
+                try:
+                    with self.metrics.measure("fast_path_round_trip"):
+                        fast_response = await self.start_fast_path(messages, stream)
+                except Exception as e:
+                    self.metrics.record_error(e)
+                    self.metrics.record_request("fast_path_fallback")
+                    await self.emit_status(
+                        __event_emitter__,
+                        "warning",
+                        "⚠️ Local model unavailable; using the full Jaguar workflow...",
+                        False,
+                        0.2
+                    )
+                else:
+                    if isinstance(fast_response, httpx.Response):
+                        handoff = StreamHandoff(fast_response)
+                        return handoff.watch(
+                            self.stream_fast_path_response(
+                                fast_response, session_id, user_message, complexity_analysis,
+                                started_at, __event_emitter__, handoff
+                            ),
+                            started_at + self.valves.timeout - time.monotonic()
+                        )
+                    await self.schedule_interaction(session_id, user_message, fast_response, complexity_analysis)
+                    self.finish_request_metrics("fast_path", started_at, path="fast_path")
+                    total_time = time.monotonic() - started_at
+                    await self.emit_status(
+                        __event_emitter__,
+                        "success",
+                        f"⚡ Jaguar answered locally in {total_time:.2f}s",
+                        True,
+                        1.0,
+                        metrics={"path": "fast_path", "total_time": round(total_time, 3)}
+                    )
+                    if self.valves.enable_debug_logging:
+                        fast_response += self.format_debug_info(session_id, complexity_analysis)
+                    body["messages"].append({
+                        "role": "assistant",
+                        "content": fast_response
+                    })
+                    return body
+            
+            # Attach double submits and retries to the identical request already running
+            flight_key = self.get_flight_key(session_id, user_message)
+            pending_flight = self._inflight.get(flight_key)
+            if pending_flight is not None:
+                self.coalesced_requests += 1
+                await self.emit_status(
+                    __event_emitter__,
+                    "info",
+                    "⏳ An identical request is already running; waiting for its result...",
+                    False,
+                    0.3
+                )
+                try:
+                    jaguar_response = await asyncio.wait_for(asyncio.shield(pending_flight), request_timeout)
+                except asyncio.TimeoutError as e:
+                    raise Exception(
+                        f"The identical request did not finish within {request_timeout:.0f}s"
+                    ) from e
+                self.finish_request_metrics("coalesced", started_at)
+                await self.emit_status(
+                    __event_emitter__,
+                    "success",
+                    "✅ Jaguar AGI has completed the task with enhanced intelligence",
+                    True,
+                    1.0,
+                    metrics={"coalesced": True}
+                )
+                body["messages"].append({
+                    "role": "assistant",
+                    "content": jaguar_response
+                })
+                return body
+            # The leader may queue for a slot and poll for longer than a single call's deadline
+            flight = self.start_flight(
+                flight_key,
+                self.valves.admission_queue_timeout + max(request_timeout, self.valves.poll_timeout)
+            )
+            
+            # A first catalog listing is awaited here, so it never holds a worker slot
+            await self.refresh_workflow_catalog(complexity_analysis)
+            
+            # Wait for a fair share of the N8N workers
+            admitted = await self.wait_for_admission(
+                (__user__ or {}).get("id") or "anonymous", __event_emitter__
+            )
+            
+            # Prepare enhanced payload once this chat's previous turn is fully recorded
+            await self.bookkeeping.wait_for(session_id)
+            with self.metrics.measure("payload_build"):
+                payload = self.build_payload(
+                    user_message, session_id, message_id, __user__, complexity_analysis, stream
+                )
             
             await self.emit_status(
                 __event_emitter__,
                 "info",
                 "🚀 Executing Jaguar AGI workflow...",
                 False,
-                0.3
+                0.3,
+                metrics={"deadline": round(request_timeout, 1)}
             )
             
             # Execute main workflow
-            response_data = await self.execute_n8n_workflow(payload, __event_emitter__)
+            with self.metrics.measure("n8n_round_trip"):
+                if self.should_poll_execution(complexity_analysis, stream):
+                    response_data = await self.execute_and_poll(payload, complexity_analysis, __event_emitter__)
+                else:
+                    round_trip_started = time.monotonic()
+                    response_data = await self.execute_n8n_workflow(
+                        payload, __event_emitter__, stream=stream, timeout=request_timeout
+                    )
+            
+            if isinstance(response_data, httpx.Response):
+                # From here the stream owns the admission slot and the flight, even if it is never read
+                def release_stream(result, error, flight=flight, admitted=admitted):
+                    if admitted:
+                        self.admission.release()
+                    self.finish_flight(flight, result=result, error=error)
+                
+                handoff = StreamHandoff(response_data, release_stream)
+                streaming_handoff = True
+                return handoff.watch(
+                    self.stream_n8n_response(
+                        response_data, payload, session_id, user_message, complexity_analysis,
+                        started_at, __event_emitter__, cache_key, handoff, request_timeout
+                    ),
+                    started_at + request_timeout - time.monotonic()
+                )
             
             await self.emit_status(
                 __event_emitter__,
@@ -365,33 +2831,22 @@ class Pipe:
                 0.8
             )
             
-            # Extract response
-            jaguar_response = response_data.get(self.valves.response_field, "")
-            
-            if not jaguar_response:
-                # Fallback response extraction
-                jaguar_response = (
-                    response_data.get("result", "") or
-                    response_data.get("message", "") or
-                    str(response_data)
-                )
-            
-            # Handle learning and adaptation
-            await self.handle_learning_and_adaptation(
-                session_id, user_message, jaguar_response, __event_emitter__
-            )
+            if admitted:
+                admitted = False
+                self.admission.release()
+            if round_trip_started is not None:
+                self.observe_workflow_latency(complexity_analysis, time.monotonic() - round_trip_started)
             
-            # Update session context
-            if session_id not in self.session_context:
-                self.session_context[session_id] = {
-                    "created_at": datetime.now(timezone.utc).isoformat(),
-                    "message_count": 0,
-                    "capabilities_used": set()
-                }
+            # Extract response
+            with self.metrics.measure("extraction"):
+                jaguar_response = self.extract_response(response_data)
+            self.finish_flight(flight, result=jaguar_response)
+            self.acknowledge_session_version(session_id, payload, response_data)
+            if cache_key:
+                self.response_cache.put(cache_key, jaguar_response)
             
-            self.session_context[session_id]["message_count"] += 1
-            self.session_context[session_id]["last_activity"] = datetime.now(timezone.utc).isoformat()
-            self.session_context[session_id]["capabilities_used"].update(complexity_analysis["capabilities"])
+            await self.schedule_interaction(session_id, user_message, jaguar_response, complexity_analysis)
+            self.finish_request_metrics("success", started_at, path="n8n")
             
             await self.emit_status(
                 __event_emitter__,
@@ -405,7 +2860,7 @@ class Pipe:
             enhanced_response = jaguar_response
             
             if self.valves.enable_debug_logging:
-                enhanced_response += f"\n\n---\n**Debug Info:**\n- Session: {session_id}\n- Complexity: {complexity_analysis['complexity_score']}/7\n- Capabilities: {', '.join(complexity_analysis['capabilities'])}"
+                enhanced_response += self.format_debug_info(session_id, complexity_analysis)
             
             body["messages"].append({
                 "role": "assistant",
@@ -414,6 +2869,13 @@ class Pipe:
             
         except Exception as e:
             error_message = str(e)
+            if flight:
+                self.finish_flight(flight, error=e)
+            self.metrics.record_error(e)
+            self.finish_request_metrics("error", started_at)
+            if round_trip_started is not None and isinstance(e.__cause__, (asyncio.TimeoutError, httpx.TimeoutException)):
+                # A timed-out call needed at least its whole budget; counting it lets deadlines grow
+                self.observe_workflow_latency(complexity_analysis, time.monotonic() - round_trip_started)
             await self.emit_status(
                 __event_emitter__,
                 "error",
@@ -441,5 +2903,11 @@ I'm continuously learning and improving. Please try again or contact The Spatial
                 "role": "assistant",
                 "content": error_response
             })
+        finally:
+            # Never leave duplicates waiting on a request cancelled mid-flight
+            if flight and not streaming_handoff:
+                self.finish_flight(flight, error=Exception("The original request was cancelled"))
+            if admitted and not streaming_handoff:
+                self.admission.release()
 
         return body
@@ -3,15 +3,24 @@ title: n8n Pipe Function
 author: Cole Medin
 author_url: https://www.youtube.com/@ColeMedin
 version: 0.1.0
+requirements: httpx
 
 This module defines a Pipe class that utilizes N8N for an Agent
 """
 
-from typing import Optional, Callable, Awaitable
+from typing import Optional, Callable, Awaitable, Any, Dict, List, Set, Tuple
 from pydantic import BaseModel, Field
+from urllib.parse import urlsplit
 import os
 import time
-import requests
+import asyncio
+import random
+import httpx
+
+try:
+    import h2
+except ImportError:
+    h2 = None
 
 def extract_event_info(event_emitter) -> tuple[Optional[str], Optional[str]]:
     if not event_emitter or not event_emitter.__closure__:
@@ -23,6 +32,82 @@ def extract_event_info(event_emitter) -> tuple[Optional[str], Optional[str]]:
             return chat_id, message_id
     return None, None
 
+class EndpointPool:
+    """Webhook endpoints picked per request by least outstanding requests or EWMA latency.
+
+    Endpoints failing ``eject_after_failures`` requests in a row are ejected for
+    ``eject_duration``; endpoints failing a health check are skipped until one
+    passes. A passing health check does not end an ejection early. While any
+    endpoint is left, ejected and unhealthy ones are skipped.
+    """
+
+    def __init__(self):
+        self.policy = "least_outstanding"
+        self.eject_after_failures = 3
+        self.eject_duration = 30.0
+        self.endpoints: Dict[str, Dict[str, Any]] = {}
+
+    def configure(self, urls: List[str], policy: str, eject_after_failures: int, eject_duration: float):
+        self.policy = policy
+        self.eject_after_failures = eject_after_failures
+        self.eject_duration = eject_duration
+        self.endpoints = {
+            url: self.endpoints.get(url)
+            or {"outstanding": 0, "ewma": None, "failures": 0, "healthy": True, "ejected_until": 0.0}
+            for url in urls
+        }
+
+    def is_available(self, url: str) -> bool:
+        endpoint = self.endpoints[url]
+        return endpoint["healthy"] and endpoint["ejected_until"] <= time.monotonic()
+
+    def choose(self, exclude: Set[str] = frozenset()) -> str:
+        candidates = [url for url in self.endpoints if url not in exclude] or list(self.endpoints)
+        # Fail open: with every endpoint ejected, still try them rather than refuse the request
+        candidates = [url for url in candidates if self.is_available(url)] or candidates
+
+        def load(url: str) -> Tuple[float, float]:
+            endpoint = self.endpoints[url]
+            ewma = endpoint["ewma"] or 0.0
+            if self.policy == "ewma":
+                return (ewma * (endpoint["outstanding"] + 1), endpoint["outstanding"])
+            return (endpoint["outstanding"], ewma)
+
+        best = min(map(load, candidates))
+        return random.choice([url for url in candidates if load(url) == best])
+
+    def begin(self, url: str):
+        self.endpoints[url]["outstanding"] += 1
+
+    def finish(self, url: str, latency: Optional[float] = None, ok: bool = True):
+        endpoint = self.endpoints.get(url)
+        if endpoint is None:
+            return
+        endpoint["outstanding"] -= 1
+        if ok:
+            endpoint["failures"] = 0
+            if latency is not None:
+                endpoint["ewma"] = latency if endpoint["ewma"] is None else 0.3 * latency + 0.7 * endpoint["ewma"]
+            return
+        endpoint["failures"] += 1
+        if endpoint["failures"] >= self.eject_after_failures:
+            endpoint["ejected_until"] = time.monotonic() + self.eject_duration
+
+    def set_health(self, url: str, healthy: bool):
+        endpoint = self.endpoints.get(url)
+        if endpoint is not None:
+            endpoint["healthy"] = healthy
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            url: {
+                "outstanding": endpoint["outstanding"],
+                "ewma_ms": None if endpoint["ewma"] is None else round(endpoint["ewma"] * 1000, 1),
+                "available": self.is_available(url)
+            }
+            for url, endpoint in self.endpoints.items()
+        }
+
 class Pipe:
     class Valves(BaseModel):
         n8n_url: str = Field(
@@ -31,6 +116,41 @@ class Pipe:
         n8n_bearer_token: str = Field(default="...")
         input_field: str = Field(default="chatInput")
         response_field: str = Field(default="output")
+        timeout: float = Field(
+            default=120.0, description="Seconds to wait for the workflow's reply before giving up"
+        )
+        connect_timeout: float = Field(
+            default=10.0, description="Seconds to wait for a connection to n8n"
+        )
+        keepalive_expiry: float = Field(
+            default=60.0, description="Seconds an idle connection to n8n is kept open for reuse"
+        )
+        enable_http2: bool = Field(
+            default=False, description="Multiplex requests over HTTP/2 when n8n (or its proxy) supports it; needs the h2 package"
+        )
+        warm_up_on_load: bool = Field(
+            default=True, description="Open connections to n8n when the function loads so the first message skips the handshake"
+        )
+        n8n_pool_urls: str = Field(
+            default="",
+            description="Comma-separated webhook URLs of more n8n workers sharing the load with n8n_url"
+        )
+        load_balancing_policy: str = Field(
+            default="least_outstanding",
+            description="'least_outstanding' or 'ewma' (latency-weighted) choice of n8n worker"
+        )
+        health_check_path: str = Field(
+            default="/healthz", description="Path probed on each worker's host by the background health check"
+        )
+        health_check_interval: float = Field(
+            default=10.0, description="Seconds between background health checks of pooled workers (0 disables)"
+        )
+        eject_after_failures: int = Field(
+            default=3, description="Consecutive failed requests before a worker is ejected from the pool"
+        )
+        eject_duration: float = Field(
+            default=30.0, description="Seconds an ejected worker is skipped before it is tried again"
+        )
         emit_interval: float = Field(
             default=2.0, description="Interval in seconds between status emissions"
         )
@@ -44,7 +164,56 @@ class Pipe:
         self.name = "N8N Pipe"
         self.valves = self.Valves()
         self.last_emit_time = 0
-        pass
+        self.endpoint_pool = EndpointPool()
+        self._health_task: Optional[asyncio.Task] = None
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._http_client_config: Optional[tuple] = None
+        self._warm_up_task: Optional[asyncio.Task] = None
+        self.get_http_client()
+        # OpenWebUI loads functions inside its event loop and applies saved valves
+        # before the next await, so a task scheduled here sees the configured URLs
+        try:
+            self._warm_up_task = asyncio.get_running_loop().create_task(self.on_startup())
+        except RuntimeError:
+            pass
+
+    async def on_startup(self):
+        if self.valves.warm_up_on_load:
+            await self.warm_up()
+
+    async def on_valves_updated(self):
+        if self.valves.warm_up_on_load:
+            await self.warm_up()
+
+    def get_http_client(self) -> httpx.AsyncClient:
+        config = (
+            self.valves.timeout,
+            self.valves.connect_timeout,
+            self.valves.keepalive_expiry,
+            self.valves.enable_http2 and h2 is not None,
+        )
+        if self._http_client is None or self._http_client.is_closed or config != self._http_client_config:
+            previous_client = self._http_client
+            self._http_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.valves.timeout, connect=self.valves.connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=100,
+                    max_keepalive_connections=20,
+                    keepalive_expiry=self.valves.keepalive_expiry,
+                ),
+                http2=config[3],
+            )
+            self._http_client_config = config
+            if previous_client is not None and not previous_client.is_closed:
+                try:
+                    asyncio.get_running_loop().create_task(previous_client.aclose())
+                except RuntimeError:
+                    pass
+        return self._http_client
+
+    async def warm_up(self):
+        """Open a pooled connection to every n8n worker by probing its health path."""
+        await asyncio.gather(*(self.probe_endpoint(url) for url in self.get_endpoint_urls()))
 
     async def emit_status(
         self,
@@ -74,6 +243,75 @@ class Pipe:
             )
             self.last_emit_time = current_time
 
+    def get_endpoint_urls(self) -> List[str]:
+        urls = [self.valves.n8n_url] + [
+            url.strip() for url in self.valves.n8n_pool_urls.split(",") if url.strip()
+        ]
+        return list(dict.fromkeys(urls))
+
+    def ensure_health_checks(self):
+        if self.valves.health_check_interval <= 0 or len(self.endpoint_pool.endpoints) < 2:
+            return
+        if self._health_task is None or self._health_task.done():
+            self._health_task = asyncio.create_task(self.run_health_checks())
+
+    async def run_health_checks(self):
+        while self.valves.health_check_interval > 0 and len(self.endpoint_pool.endpoints) > 1:
+            await asyncio.gather(*(self.check_endpoint(url) for url in list(self.endpoint_pool.endpoints)))
+            await asyncio.sleep(self.valves.health_check_interval)
+
+    async def probe_endpoint(self, url: str) -> bool:
+        try:
+            parts = urlsplit(url)
+            health_url = f"{parts.scheme}://{parts.netloc}{self.valves.health_check_path}"
+            response = await self.get_http_client().get(health_url, timeout=5)
+            return response.status_code == 200
+        except (httpx.HTTPError, httpx.InvalidURL, ValueError):
+            # An unset or malformed URL (e.g. the default placeholder) is just unhealthy
+            return False
+
+    async def check_endpoint(self, url: str):
+        self.endpoint_pool.set_health(url, await self.probe_endpoint(url))
+
+    async def post_to_endpoint(self, payload: dict, headers: dict) -> httpx.Response:
+        """POST to the pooled worker picked by the load-balancing policy.
+
+        Requests share one keep-alive client, so concurrent chats overlap without
+        paying a new handshake each. A worker that refuses the connection is
+        skipped in favour of the next one.
+        """
+        self.endpoint_pool.configure(
+            self.get_endpoint_urls(),
+            self.valves.load_balancing_policy,
+            self.valves.eject_after_failures,
+            self.valves.eject_duration,
+        )
+        self.ensure_health_checks()
+        client = self.get_http_client()
+        tried = set()
+        while True:
+            url = self.endpoint_pool.choose(exclude=tried)
+            tried.add(url)
+            self.endpoint_pool.begin(url)
+            started = time.monotonic()
+            try:
+                response = await client.post(url, json=payload, headers=headers)
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                self.endpoint_pool.finish(url, ok=False)
+                if len(tried) >= len(self.endpoint_pool.endpoints):
+                    raise
+                continue
+            except httpx.TimeoutException as e:
+                self.endpoint_pool.finish(url, ok=False)
+                raise Exception(f"n8n did not answer within {self.valves.timeout:g}s") from e
+            except Exception:
+                self.endpoint_pool.finish(url, ok=False)
+                raise
+            self.endpoint_pool.finish(
+                url, time.monotonic() - started, ok=response.status_code < 500
+            )
+            return response
+
     async def pipe(
         self,
         body: dict,
@@ -98,9 +336,7 @@ class Pipe:
                 }
                 payload = {"sessionId": f"{chat_id}"}
                 payload[self.valves.input_field] = question
-                response = requests.post(
-                    self.valves.n8n_url, json=payload, headers=headers
-                )
+                response = await self.post_to_endpoint(payload, headers)
                 if response.status_code == 200:
                     n8n_response = response.json()[self.valves.response_field]
                 else: